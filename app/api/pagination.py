@@ -0,0 +1,40 @@
+import base64
+import binascii
+import json
+from collections.abc import Callable, Sequence
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any
+
+from fastapi import HTTPException
+
+
+def encode_cursor(*values: Any) -> str:
+    """Pack keyset values of the last row into an opaque URL-safe token."""
+    raw = json.dumps([_dump(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: Callable[[Any], Any]) -> list[Any]:
+    """Unpack a token produced by encode_cursor, converting each value with `types`."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("cursor shape mismatch")
+        return [None if value is None else cast(value) for cast, value in zip(types, values)]
+    except (ValueError, TypeError, InvalidOperation, binascii.Error, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def split_page(rows: Sequence[Any], limit: int) -> tuple[Sequence[Any], bool]:
+    """Rows are fetched with limit + 1; the extra row only signals another page."""
+    return rows[:limit], len(rows) > limit
+
+
+def _dump(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
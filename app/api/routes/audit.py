@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.api.deps import get_db
+from app.api.pagination import decode_cursor, encode_cursor, split_page
+from app.schemas import AuditLogRead, Page
+
+router = APIRouter(prefix="/audit", tags=["audit"])
+
+# Without a record or a start of the window, listings cover the last day: the
+# BRIN index and partition pruning then limit the scan to recent blocks.
+_DEFAULT_WINDOW = timedelta(days=1)
+
+
+@router.get("", response_model=Page[AuditLogRead])
+async def list_audit_log(
+    db: AsyncSession = Depends(get_db),
+    table_name: str | None = Query(default=None, max_length=100),
+    record_id: str | None = Query(default=None, max_length=100),
+    performed_by: int | None = Query(default=None),
+    action: str | None = Query(default=None, pattern="^(INSERT|UPDATE|DELETE)$"),
+    performed_from: datetime | None = Query(default=None),
+    performed_to: datetime | None = Query(default=None),
+    cursor: str | None = Query(default=None),
+    limit: int = Query(50, ge=1, le=200),
+) -> Page[AuditLogRead]:
+    if record_id is not None and table_name is None:
+        raise HTTPException(status_code=422, detail="record_id requires table_name")
+    if record_id is None and performed_from is None:
+        performed_from = (performed_to or datetime.now(timezone.utc)) - _DEFAULT_WINDOW
+
+    query = select(models.AuditLog)
+    if table_name is not None:
+        query = query.where(models.AuditLog.table_name == table_name)
+    if record_id is not None:
+        query = query.where(models.AuditLog.record_id == record_id)
+    if performed_by is not None:
+        query = query.where(models.AuditLog.performed_by == performed_by)
+    if action is not None:
+        query = query.where(models.AuditLog.action == action)
+    if performed_from is not None:
+        query = query.where(models.AuditLog.performed_at >= performed_from)
+    if performed_to is not None:
+        query = query.where(models.AuditLog.performed_at < performed_to)
+    if cursor is not None:
+        last_performed, last_id = decode_cursor(cursor, datetime.fromisoformat, int)
+        query = query.where(
+            tuple_(models.AuditLog.performed_at, models.AuditLog.id) < tuple_(
+                last_performed, last_id)
+        )
+    query = query.order_by(
+        models.AuditLog.performed_at.desc(), models.AuditLog.id.desc()).limit(limit + 1)
+
+    result = await db.execute(query)
+    entries, has_more = split_page(result.scalars().all(), limit)
+    next_cursor = encode_cursor(
+        entries[-1].performed_at, entries[-1].id) if has_more else None
+    return Page[AuditLogRead](items=entries, next_cursor=next_cursor)
@@ -1,14 +1,77 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select
+import hashlib
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from pydantic import TypeAdapter
+from sqlalchemy import func, literal_column, select, tuple_
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import models
 from app.api.deps import get_db
-from app.schemas import CourseCreate, CourseRead, CourseUpdate
+from app.api.pagination import decode_cursor, encode_cursor, split_page
+from app.core.cache import SingleFlightCache
+from app.core.config import settings
+from app.schemas import (
+    CourseCreate,
+    CourseDetail,
+    CourseModuleRead,
+    CourseRead,
+    CourseReviewsPage,
+    CourseSearchResult,
+    CourseUpdate,
+    LessonSummary,
+    Page,
+)
 
 router = APIRouter(prefix="/courses", tags=["courses"])
 
+_course_list = TypeAdapter(list[CourseRead])
+
+_SORT_TYPES = {
+    "created_at": datetime.fromisoformat,
+    "price": Decimal,
+    "avg_rating": Decimal,
+    "enrollments_count": int,
+    "total_revenue": Decimal,
+}
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    body: bytes
+    etag: str
+
+    @classmethod
+    def build(cls, page: Page[CourseRead]) -> "CachedPage":
+        body = page.model_dump_json().encode("utf-8")
+        return cls(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+    def response(self, request: Request) -> Response:
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if self.etag in _parse_if_none_match(request.headers.get("if-none-match")):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+
+catalog_cache = SingleFlightCache(
+    "courses.catalog",
+    max_size=settings.course_cache_size,
+    ttl=settings.course_cache_ttl_seconds,
+)
+# Keyed by (course_id, curriculum_version): module/lesson triggers bump the
+# version, so stale trees are simply never hit again and age out of the LRU.
+curriculum_cache = SingleFlightCache(
+    "courses.curriculum",
+    max_size=settings.curriculum_cache_size,
+    ttl=settings.curriculum_cache_ttl_seconds,
+)
+_catalog_version: datetime | None = None
+_catalog_checked_at = 0.0
+
 
 @router.post("", response_model=CourseRead, status_code=status.HTTP_201_CREATED)
 async def create_course(payload: CourseCreate, db: AsyncSession = Depends(get_db)) -> CourseRead:
@@ -20,17 +83,155 @@ async def create_course(payload: CourseCreate, db: AsyncSession = Depends(get_db
         await db.rollback()
         raise HTTPException(status_code=400, detail="Course creation failed")
     await db.refresh(course)
+    catalog_cache.invalidate()
     return course
 
 
-@router.get("", response_model=list[CourseRead])
+@router.get("", response_model=Page[CourseRead])
 async def list_courses(
+    request: Request,
     db: AsyncSession = Depends(get_db),
+    sort: str = Query(
+        "created_at", pattern="^(created_at|price|avg_rating|enrollments_count|total_revenue)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    course_status: str | None = Query(
+        default=None, alias="status", pattern="^(draft|published|archived)$"),
+    author_id: int | None = Query(default=None),
+    min_price: Decimal | None = Query(default=None, ge=0),
+    max_price: Decimal | None = Query(default=None, ge=0),
+    cursor: str | None = Query(default=None),
     limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
-) -> list[CourseRead]:
-    result = await db.execute(select(models.Course).limit(limit).offset(offset))
-    return result.scalars().all()
+) -> Response:
+    await _revalidate_catalog(db)
+    after = None
+    if cursor is not None:
+        cursor_sort, *after = decode_cursor(cursor, str, _SORT_TYPES[sort], int)
+        if cursor_sort != sort:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    key = (sort, order, course_status, author_id, min_price, max_price, cursor, limit)
+
+    async def load() -> CachedPage:
+        column = getattr(models.Course, sort)
+        query = select(models.Course)
+        if course_status == "published":
+            # A constant in the SQL text rather than a bound value, so that
+            # generic plans can still use the partial "published" indexes.
+            query = query.where(models.Course.status == literal_column("'published'"))
+        elif course_status is not None:
+            query = query.where(models.Course.status == course_status)
+        if author_id is not None:
+            query = query.where(models.Course.author_id == author_id)
+        if min_price is not None:
+            query = query.where(models.Course.price >= min_price)
+        if max_price is not None:
+            query = query.where(models.Course.price <= max_price)
+        if after is not None:
+            keyset = tuple_(column, models.Course.id)
+            bound = tuple_(*after)
+            query = query.where(keyset < bound if order == "desc" else keyset > bound)
+        if order == "desc":
+            query = query.order_by(column.desc(), models.Course.id.desc())
+        else:
+            query = query.order_by(column.asc(), models.Course.id.asc())
+
+        result = await db.execute(query.limit(limit + 1))
+        courses, has_more = split_page(result.scalars().all(), limit)
+        next_cursor = (
+            encode_cursor(sort, getattr(courses[-1], sort), courses[-1].id)
+            if has_more else None
+        )
+        return CachedPage.build(Page[CourseRead](
+            items=_course_list.validate_python(courses), next_cursor=next_cursor))
+
+    page = await catalog_cache.get_or_load(key, load)
+    return page.response(request)
+
+
+@router.get("/search", response_model=Page[CourseSearchResult])
+async def search_courses(
+    db: AsyncSession = Depends(get_db),
+    q: str = Query(min_length=1, max_length=200),
+    cursor: str | None = Query(default=None),
+    limit: int = Query(20, ge=1, le=100),
+) -> Page[CourseSearchResult]:
+    ts_query = func.websearch_to_tsquery("simple", q)
+    # Text relevance first, boosted by rating (0..5) and, logarithmically, by popularity.
+    rank = (
+        func.ts_rank(models.Course.search_vector, ts_query)
+        * (1 + 0.1 * models.Course.avg_rating + 0.05 * func.ln(1 + models.Course.enrollments_count))
+    ).label("rank")
+
+    query = select(models.Course, rank).where(
+        models.Course.status == "published",
+        models.Course.search_vector.op("@@")(ts_query),
+    )
+    if cursor is not None:
+        last_rank, last_id = decode_cursor(cursor, float, int)
+        query = query.where(tuple_(rank, models.Course.id)
+                            < tuple_(last_rank, last_id))
+    query = query.order_by(rank.desc(), models.Course.id.desc()).limit(limit + 1)
+
+    result = await db.execute(query)
+    rows, has_more = split_page(result.all(), limit)
+    items = [
+        CourseSearchResult.model_validate(
+            {**CourseRead.model_validate(course).model_dump(), "rank": score})
+        for course, score in rows
+    ]
+    next_cursor = encode_cursor(rows[-1].rank, rows[-1].Course.id) if has_more else None
+    return Page[CourseSearchResult](items=items, next_cursor=next_cursor)
+
+
+@router.get("/{course_id}", response_model=CourseDetail)
+async def get_course(course_id: int, db: AsyncSession = Depends(get_db)) -> CourseDetail:
+    course = await db.get(models.Course, course_id)
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+
+    modules = await curriculum_cache.get_or_load(
+        (course.id, course.curriculum_version),
+        lambda: _load_curriculum(db, course.id),
+    )
+    return CourseDetail(**CourseRead.model_validate(course).model_dump(), modules=modules)
+
+
+@router.get("/{course_id}/reviews", response_model=CourseReviewsPage)
+async def list_course_reviews(
+    course_id: int,
+    db: AsyncSession = Depends(get_db),
+    rating: int | None = Query(default=None, ge=1, le=5),
+    cursor: str | None = Query(default=None),
+    limit: int = Query(20, ge=1, le=100),
+) -> CourseReviewsPage:
+    stats = (await db.execute(
+        select(models.Course.avg_rating, models.Course.reviews_count,
+               models.Course.rating_counts)
+        .where(models.Course.id == course_id)
+    )).one_or_none()
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+
+    query = select(models.Review).where(models.Review.course_id == course_id)
+    if rating is not None:
+        query = query.where(models.Review.rating == rating)
+    if cursor is not None:
+        last_created, last_id = decode_cursor(cursor, datetime.fromisoformat, int)
+        query = query.where(tuple_(models.Review.created_at, models.Review.id)
+                            < tuple_(last_created, last_id))
+    query = query.order_by(
+        models.Review.created_at.desc(), models.Review.id.desc()).limit(limit + 1)
+
+    result = await db.execute(query)
+    reviews, has_more = split_page(result.scalars().all(), limit)
+    next_cursor = encode_cursor(
+        reviews[-1].created_at, reviews[-1].id) if has_more else None
+    return CourseReviewsPage(
+        items=reviews,
+        next_cursor=next_cursor,
+        avg_rating=stats.avg_rating,
+        reviews_count=stats.reviews_count,
+        histogram=dict(enumerate(stats.rating_counts, start=1)),
+    )
 
 
 @router.patch("/{course_id}", response_model=CourseRead)
@@ -53,4 +254,51 @@ async def update_course(
         await db.rollback()
         raise HTTPException(status_code=400, detail="Failed to update course")
     await db.refresh(course)
+    catalog_cache.invalidate()
     return course
+
+
+async def _load_curriculum(db: AsyncSession, course_id: int) -> list[CourseModuleRead]:
+    """Modules and lessons (without content) in two queries, ordered by position."""
+    modules = await db.execute(
+        select(models.CourseModule.id, models.CourseModule.title,
+               models.CourseModule.description, models.CourseModule.position)
+        .where(models.CourseModule.course_id == course_id)
+        .order_by(models.CourseModule.position)
+    )
+    tree = {row.id: CourseModuleRead.model_validate(row) for row in modules}
+    lessons = await db.execute(
+        select(models.Lesson.module_id, models.Lesson.id, models.Lesson.title,
+               models.Lesson.position, models.Lesson.duration_minutes)
+        .where(models.Lesson.course_id == course_id)
+        .order_by(models.Lesson.module_id, models.Lesson.position)
+    )
+    for row in lessons:
+        if row.module_id in tree:
+            tree[row.module_id].lessons.append(LessonSummary.model_validate(row))
+    return list(tree.values())
+
+
+async def _revalidate_catalog(db: AsyncSession) -> None:
+    """Drop cached pages when courses changed outside this process.
+
+    Aggregate triggers bump courses.updated_at, so max(updated_at) (an index
+    lookup) is checked at most once per COURSE_CACHE_REVALIDATE_MS. Entries
+    also expire after COURSE_CACHE_TTL_SECONDS, which bounds staleness from
+    transactions that commit with an older now().
+    """
+    global _catalog_version, _catalog_checked_at
+    now = time.monotonic()
+    if now - _catalog_checked_at < settings.course_cache_revalidate_ms / 1000:
+        return
+    _catalog_checked_at = now
+    version = await db.scalar(select(func.max(models.Course.updated_at)))
+    if version != _catalog_version:
+        _catalog_version = version
+        catalog_cache.invalidate()
+
+
+def _parse_if_none_match(header: str | None) -> set[str]:
+    if not header:
+        return set()
+    return {tag.strip().removeprefix("W/") for tag in header.split(",")}
@@ -1,14 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
+import csv
+import io
+from collections.abc import AsyncIterator
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import ARRAY, BigInteger, Integer, Select, cast, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import models
 from app.api.deps import get_db
-from app.schemas import EnrollmentCreate, EnrollmentRead
+from app.api.pagination import decode_cursor, encode_cursor, split_page
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.schemas import (
+    EnrollmentBulkCreate,
+    EnrollmentBulkCreated,
+    EnrollmentBulkResult,
+    EnrollmentCreate,
+    EnrollmentPair,
+    EnrollmentRead,
+    Page,
+)
 
 router = APIRouter(prefix="/enrollments", tags=["enrollments"])
 
+_EXPORT_FIELDS = list(EnrollmentRead.model_fields)
+_EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
 
 @router.post("", response_model=EnrollmentRead, status_code=status.HTTP_201_CREATED)
 async def create_enrollment(payload: EnrollmentCreate, db: AsyncSession = Depends(get_db)) -> EnrollmentRead:
@@ -24,7 +45,150 @@ async def create_enrollment(payload: EnrollmentCreate, db: AsyncSession = Depend
     return enrollment
 
 
-@router.get("", response_model=list[EnrollmentRead])
-async def list_enrollments(db: AsyncSession = Depends(get_db)) -> list[EnrollmentRead]:
-    result = await db.execute(select(models.Enrollment))
-    return result.scalars().all()
+@router.post("/bulk", response_model=EnrollmentBulkResult, status_code=status.HTTP_201_CREATED)
+async def create_enrollments_bulk(
+    payload: EnrollmentBulkCreate, db: AsyncSession = Depends(get_db)
+) -> EnrollmentBulkResult:
+    pairs = list(dict.fromkeys(
+        (item.user_id, item.course_id) for item in payload.enrollments))
+    source = func.unnest(
+        cast([user_id for user_id, _ in pairs], ARRAY(Integer)),
+        cast([course_id for _, course_id in pairs], ARRAY(BigInteger)),
+    ).table_valued("user_id", "course_id").render_derived("p")
+    # Pairs with unknown users or courses are dropped by the joins instead of
+    # failing the whole statement on a foreign key violation.
+    rows = (
+        select(source.c.user_id, source.c.course_id)
+        .join(models.User, models.User.id == source.c.user_id)
+        .join(models.Course, models.Course.id == source.c.course_id)
+    )
+    stmt = (
+        insert(models.Enrollment)
+        .from_select(["user_id", "course_id"], rows)
+        .on_conflict_do_nothing(constraint="uq_enrollments_user_course")
+        .returning(models.Enrollment.id, models.Enrollment.user_id, models.Enrollment.course_id)
+    )
+    try:
+        result = await db.execute(stmt)
+        created = {(row.user_id, row.course_id): row.id for row in result}
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Failed to create enrollments")
+
+    return EnrollmentBulkResult(
+        created=[
+            EnrollmentBulkCreated(id=created[pair], user_id=pair[0], course_id=pair[1])
+            for pair in pairs if pair in created
+        ],
+        skipped=_skipped_items(payload.enrollments, created),
+    )
+
+
+@router.get("", response_model=Page[EnrollmentRead])
+async def list_enrollments(
+    db: AsyncSession = Depends(get_db),
+    course_id: int | None = Query(default=None),
+    enrollment_status: str | None = Query(
+        default=None, alias="status", pattern="^(active|completed|cancelled)$"),
+    created_from: datetime | None = Query(default=None),
+    created_to: datetime | None = Query(default=None),
+    cursor: str | None = Query(default=None),
+    limit: int = Query(50, ge=1, le=200),
+) -> Page[EnrollmentRead]:
+    query = _filter_enrollments(
+        select(models.Enrollment), course_id, enrollment_status, created_from, created_to)
+    if cursor is not None:
+        last_created, last_id = decode_cursor(
+            cursor, datetime.fromisoformat, int)
+        query = query.where(
+            tuple_(models.Enrollment.created_at, models.Enrollment.id) < tuple_(
+                last_created, last_id)
+        )
+    query = query.order_by(
+        models.Enrollment.created_at.desc(), models.Enrollment.id.desc()).limit(limit + 1)
+
+    result = await db.execute(query)
+    enrollments, has_more = split_page(result.scalars().all(), limit)
+    next_cursor = encode_cursor(
+        enrollments[-1].created_at, enrollments[-1].id) if has_more else None
+    return Page[EnrollmentRead](items=enrollments, next_cursor=next_cursor)
+
+
+@router.get("/export")
+async def export_enrollments(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    course_id: int | None = Query(default=None),
+    enrollment_status: str | None = Query(
+        default=None, alias="status", pattern="^(active|completed|cancelled)$"),
+    created_from: datetime | None = Query(default=None),
+    created_to: datetime | None = Query(default=None),
+) -> StreamingResponse:
+    query = _filter_enrollments(
+        select(*(getattr(models.Enrollment, field) for field in _EXPORT_FIELDS)),
+        course_id, enrollment_status, created_from, created_to,
+    ).order_by(models.Enrollment.created_at, models.Enrollment.id)
+
+    return StreamingResponse(
+        _stream_export(query, export_format),
+        media_type=_EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="enrollments.{export_format}"'},
+    )
+
+
+def _skipped_items(
+    items: list[EnrollmentPair], created: dict[tuple[int, int], int]
+) -> list[EnrollmentPair]:
+    """Items that did not produce a row, a repeated pair counts once as created."""
+    seen: set[tuple[int, int]] = set()
+    skipped = []
+    for item in items:
+        pair = (item.user_id, item.course_id)
+        if pair in created and pair not in seen:
+            seen.add(pair)
+        else:
+            skipped.append(item)
+    return skipped
+
+
+def _filter_enrollments(
+    query: Select,
+    course_id: int | None,
+    enrollment_status: str | None,
+    created_from: datetime | None,
+    created_to: datetime | None,
+) -> Select:
+    if course_id is not None:
+        query = query.where(models.Enrollment.course_id == course_id)
+    if enrollment_status is not None:
+        query = query.where(models.Enrollment.status == enrollment_status)
+    if created_from is not None:
+        query = query.where(models.Enrollment.created_at >= created_from)
+    if created_to is not None:
+        query = query.where(models.Enrollment.created_at < created_to)
+    return query
+
+
+async def _stream_export(query: Select, export_format: str) -> AsyncIterator[str]:
+    """Encode rows batch by batch from a server-side cursor.
+
+    The export owns its session, so the cursor stays open for as long as the
+    client reads, and at most EXPORT_BATCH_SIZE rows are held in memory.
+    """
+    async with SessionLocal() as session:
+        result = await session.stream(query.execution_options(yield_per=settings.export_batch_size))
+        if export_format == "csv":
+            yield _csv_chunk([_EXPORT_FIELDS])
+        async for rows in result.partitions():
+            records = [EnrollmentRead.model_validate(row) for row in rows]
+            if export_format == "csv":
+                yield _csv_chunk(
+                    [record.model_dump(mode="json").values() for record in records])
+            else:
+                yield "".join(record.model_dump_json() + "\n" for record in records)
+
+
+def _csv_chunk(rows: list) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
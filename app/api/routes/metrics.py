@@ -0,0 +1,88 @@
+from datetime import datetime, timezone
+
+from fastapi import APIRouter
+
+from app.core.cache import caches
+from app.core.config import settings
+from app.core.security import password_hasher
+from app.db.outbox import outbox_consumer, outbox_lag
+from app.db.partitions import months_ahead, partition_horizons, partition_maintainer
+from app.db.progress_buffer import progress_buffer
+from app.db.session import engine
+from app.schemas import (
+    CacheMetrics,
+    OutboxMetrics,
+    PartitionMetrics,
+    PasswordHashMetrics,
+    ProgressBufferMetrics,
+)
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/outbox", response_model=OutboxMetrics)
+async def aggregate_outbox_metrics() -> OutboxMetrics:
+    lag = await outbox_lag()
+    return OutboxMetrics(
+        mode=settings.aggregate_mode,
+        pending=lag["pending"],
+        lag_seconds=lag["lag_seconds"],
+        processed_total=outbox_consumer.processed_total,
+        last_drain_at=outbox_consumer.last_drain_at,
+    )
+
+
+@router.get("/cache", response_model=list[CacheMetrics])
+async def cache_metrics() -> list[CacheMetrics]:
+    return [CacheMetrics(**cache.stats()) for cache in caches.values()]
+
+
+@router.get("/progress", response_model=ProgressBufferMetrics)
+async def progress_buffer_metrics() -> ProgressBufferMetrics:
+    return ProgressBufferMetrics(
+        pending=progress_buffer.pending,
+        in_flight=progress_buffer.in_flight,
+        capacity=progress_buffer.max_pending,
+        accepted=progress_buffer.accepted,
+        coalesced=progress_buffer.coalesced,
+        rejected=progress_buffer.rejected,
+        flushed=progress_buffer.flushed,
+        discarded=progress_buffer.discarded,
+        failed_flushes=progress_buffer.failed_flushes,
+        consecutive_failures=progress_buffer.consecutive_failures,
+        last_flush_at=progress_buffer.last_flush_at,
+        last_flush_seconds=progress_buffer.last_flush_seconds,
+    )
+
+
+@router.get("/partitions", response_model=list[PartitionMetrics])
+async def partition_metrics() -> list[PartitionMetrics]:
+    async with engine.connect() as conn:
+        horizons = await partition_horizons(conn)
+    today = datetime.now(timezone.utc).date()
+    metrics = []
+    for table, horizon in horizons.items():
+        ahead = months_ahead(horizon, today)
+        metrics.append(PartitionMetrics(
+            table=table,
+            horizon=horizon,
+            months_ahead=ahead,
+            warning=ahead < partition_maintainer.warn_months,
+            last_check_at=partition_maintainer.last_check_at,
+        ))
+    return metrics
+
+
+@router.get("/password-hashing", response_model=PasswordHashMetrics)
+async def password_hash_metrics() -> PasswordHashMetrics:
+    hashed = password_hasher.hashed_total or 1
+    return PasswordHashMetrics(
+        workers=password_hasher.workers,
+        max_pending=password_hasher.max_pending,
+        in_flight=password_hasher.in_flight,
+        waiting=password_hasher.waiting,
+        hashed_total=password_hasher.hashed_total,
+        queue_seconds_avg=password_hasher.queue_seconds_total / hashed,
+        queue_seconds_max=password_hasher.queue_seconds_max,
+        hash_seconds_avg=password_hasher.hash_seconds_total / hashed,
+    )
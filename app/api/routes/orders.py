@@ -1,83 +1,284 @@
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
+from asyncpg import PostgresError
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from sqlalchemy import insert, select, tuple_
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import models
 from app.api.deps import get_db
-from app.schemas import OrderCreate, OrderRead, PaymentCreate, PaymentRead
+from app.api.pagination import decode_cursor, encode_cursor, split_page
+from app.core.config import settings
+from app.core.idempotency import idempotent
+from app.db.bulk import copy_records
+from app.schemas import (
+    OrderBulkCreate,
+    OrderBulkItemResult,
+    OrderBulkResult,
+    OrderCreate,
+    OrderItemCreate,
+    OrderRead,
+    Page,
+    PaymentCreate,
+    PaymentRead,
+)
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
 
 @router.post("", response_model=OrderRead, status_code=status.HTTP_201_CREATED)
-async def create_order(payload: OrderCreate, db: AsyncSession = Depends(get_db)) -> OrderRead:
+async def create_order(
+    payload: OrderCreate,
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: str | None = Header(
+        default=None, alias="Idempotency-Key", max_length=255),
+) -> OrderRead:
     if not payload.items:
         raise HTTPException(
             status_code=400, detail="Order must contain at least one item")
 
-    order = models.Order(user_id=payload.user_id,
-                         status="pending", total_amount=Decimal("0"))
-    db.add(order)
-    await db.flush()
+    course_ids = [item.course_id for item in payload.items]
+    if len(set(course_ids)) != len(course_ids):
+        raise HTTPException(
+            status_code=400, detail="Order contains duplicate courses")
 
-    total = Decimal("0")
-    for item in payload.items:
-        course = await db.get(models.Course, item.course_id)
-        if not course:
-            await db.rollback()
+    async with idempotent(db, "orders.create", idempotency_key, payload) as call:
+        if call.replay is not None:
+            return call.replay
+
+        catalog = await _load_course_catalog(db, course_ids)
+        missing, unpublished = _check_courses(course_ids, catalog)
+        if missing or unpublished:
             raise HTTPException(
-                status_code=404, detail=f"Course {item.course_id} not found")
-        total += course.price * item.quantity
-        db.add(
-            models.OrderItem(
-                order_id=order.id,
-                course_id=course.id,
-                quantity=item.quantity,
-                price=course.price,
+                status_code=404 if missing else 422,
+                detail=_courses_error(missing, unpublished),
             )
-        )
 
-    order.total_amount = total
-    try:
-        await db.commit()
-    except IntegrityError:
-        await db.rollback()
-        raise HTTPException(status_code=400, detail="Failed to create order")
-    await db.refresh(order)
+        total, item_rows = _price_items(payload.items, catalog)
+        try:
+            order = await db.scalar(
+                insert(models.Order)
+                .values(user_id=payload.user_id, status="pending", total_amount=total)
+                .returning(models.Order)
+            )
+            order_key = {"order_id": order.id,
+                         "order_created_at": order.created_at}
+            await db.execute(
+                insert(models.OrderItem).values(
+                    [{**row, **order_key} for row in item_rows])
+            )
+            await call.save(db, status.HTTP_201_CREATED,
+                            OrderRead.model_validate(order))
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(
+                status_code=400, detail="Failed to create order")
     return order
 
 
-@router.post("/payments", response_model=PaymentRead, status_code=status.HTTP_201_CREATED)
-async def create_payment(payload: PaymentCreate, db: AsyncSession = Depends(get_db)) -> PaymentRead:
-    order = await db.get(models.Order, payload.order_id)
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-
-    payment = models.Payment(
-        order_id=payload.order_id,
-        amount=payload.amount,
-        status="paid",
-        provider=payload.provider,
-        transaction_id=payload.transaction_id,
-        paid_at=datetime.utcnow(),
+@router.post("/bulk", response_model=OrderBulkResult)
+async def create_orders_bulk(
+    payload: OrderBulkCreate, db: AsyncSession = Depends(get_db)
+) -> OrderBulkResult:
+    orders = payload.orders
+    catalog = await _load_course_catalog(
+        db, [item.course_id for order in orders for item in order.items])
+    user_ids = {order.user_id for order in orders}
+    result = await db.execute(
+        select(models.User.id).where(models.User.id.in_(user_ids)))
+    known_users = set(result.scalars())
+
+    results = [OrderBulkItemResult(index=idx) for idx in range(len(orders))]
+    accepted: list[tuple[int, Decimal, list[dict]]] = []
+    for idx, order in enumerate(orders):
+        error = _validate_bulk_order(order, catalog, known_users)
+        if error:
+            results[idx].error = error
+            continue
+        total, item_rows = _price_items(order.items, catalog)
+        accepted.append((idx, total, item_rows))
+
+    if accepted:
+        try:
+            inserted = await db.execute(
+                insert(models.Order).returning(
+                    models.Order.id, models.Order.created_at, sort_by_parameter_order=True),
+                [
+                    {"user_id": orders[idx].user_id,
+                        "status": "pending", "total_amount": total}
+                    for idx, total, _ in accepted
+                ],
+            )
+            order_keys = inserted.all()
+            await copy_records(
+                db,
+                models.OrderItem.__tablename__,
+                ("order_id", "order_created_at", "course_id", "quantity", "price"),
+                (
+                    (order_id, created_at, row["course_id"],
+                     row["quantity"], row["price"])
+                    for (order_id, created_at), (_, _, item_rows) in zip(order_keys, accepted)
+                    for row in item_rows
+                ),
+            )
+            await db.commit()
+        except (IntegrityError, PostgresError):
+            await db.rollback()
+            raise HTTPException(
+                status_code=400, detail="Failed to create orders")
+        for (order_id, _), (idx, total, _) in zip(order_keys, accepted):
+            results[idx].order_id = order_id
+            results[idx].total_amount = total
+
+    return OrderBulkResult(
+        created=len(accepted),
+        failed=len(orders) - len(accepted),
+        results=results,
     )
-    db.add(payment)
-
-    order.status = "paid"
-    try:
-        await db.commit()
-    except IntegrityError:
-        await db.rollback()
-        raise HTTPException(status_code=400, detail="Failed to create payment")
-    await db.refresh(payment)
+
+
+@router.post("/payments", response_model=PaymentRead, status_code=status.HTTP_201_CREATED)
+async def create_payment(
+    payload: PaymentCreate,
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: str | None = Header(
+        default=None, alias="Idempotency-Key", max_length=255),
+) -> PaymentRead:
+    async with idempotent(db, "orders.payments.create", idempotency_key, payload) as call:
+        if call.replay is not None:
+            return call.replay
+
+        order = await db.get(models.Order, payload.order_id)
+        if not order:
+            raise HTTPException(status_code=404, detail="Order not found")
+        # Reports rely on this bound to skip payment partitions of older orders.
+        if order.created_at < datetime.now(timezone.utc) - timedelta(
+                days=settings.payment_max_order_age_days):
+            raise HTTPException(status_code=409, detail="Order is too old to be paid")
+
+        payment = models.Payment(
+            order_id=payload.order_id,
+            order_created_at=order.created_at,
+            amount=payload.amount,
+            status="paid",
+            provider=payload.provider,
+            transaction_id=payload.transaction_id,
+            paid_at=datetime.utcnow(),
+        )
+        db.add(payment)
+
+        order.status = "paid"
+        try:
+            await db.flush()
+            await db.refresh(payment)
+            await call.save(db, status.HTTP_201_CREATED,
+                            PaymentRead.model_validate(payment))
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(
+                status_code=400, detail="Failed to create payment")
     return payment
 
 
-@router.get("", response_model=list[OrderRead])
-async def list_orders(db: AsyncSession = Depends(get_db)) -> list[OrderRead]:
-    result = await db.execute(select(models.Order))
-    return result.scalars().all()
+@router.get("", response_model=Page[OrderRead])
+async def list_orders(
+    db: AsyncSession = Depends(get_db),
+    user_id: int | None = Query(default=None),
+    order_status: str | None = Query(
+        default=None, alias="status", pattern="^(pending|paid|cancelled|refunded)$"),
+    created_from: datetime | None = Query(default=None),
+    created_to: datetime | None = Query(default=None),
+    cursor: str | None = Query(default=None),
+    limit: int = Query(50, ge=1, le=200),
+) -> Page[OrderRead]:
+    query = select(models.Order)
+    if user_id is not None:
+        query = query.where(models.Order.user_id == user_id)
+    if order_status is not None:
+        query = query.where(models.Order.status == order_status)
+    if created_from is not None:
+        query = query.where(models.Order.created_at >= created_from)
+    if created_to is not None:
+        query = query.where(models.Order.created_at < created_to)
+    if cursor is not None:
+        last_created, last_id = decode_cursor(
+            cursor, datetime.fromisoformat, int)
+        query = query.where(
+            tuple_(models.Order.created_at, models.Order.id) < tuple_(
+                last_created, last_id)
+        )
+    query = query.order_by(
+        models.Order.created_at.desc(), models.Order.id.desc()).limit(limit + 1)
+
+    result = await db.execute(query)
+    orders, has_more = split_page(result.scalars().all(), limit)
+    next_cursor = encode_cursor(
+        orders[-1].created_at, orders[-1].id) if has_more else None
+    return Page[OrderRead](items=orders, next_cursor=next_cursor)
+
+
+async def _load_course_catalog(
+    db: AsyncSession, course_ids: list[int]
+) -> dict[int, tuple[Decimal, str]]:
+    """Fetch price and status of all referenced courses in one query."""
+    result = await db.execute(
+        select(models.Course.id, models.Course.price, models.Course.status).where(
+            models.Course.id.in_(set(course_ids)))
+    )
+    return {row.id: (row.price, row.status) for row in result}
+
+
+def _check_courses(
+    course_ids: list[int], catalog: dict[int, tuple[Decimal, str]]
+) -> tuple[list[int], list[int]]:
+    missing = [cid for cid in course_ids if cid not in catalog]
+    unpublished = [
+        cid for cid in course_ids if cid in catalog and catalog[cid][1] != "published"
+    ]
+    return missing, unpublished
+
+
+def _courses_error(missing: list[int], unpublished: list[int]) -> str:
+    parts = []
+    if missing:
+        parts.append("Courses not found: " + ", ".join(map(str, missing)))
+    if unpublished:
+        parts.append("Courses not published: " +
+                     ", ".join(map(str, unpublished)))
+    return "; ".join(parts)
+
+
+def _price_items(
+    items: list[OrderItemCreate], catalog: dict[int, tuple[Decimal, str]]
+) -> tuple[Decimal, list[dict]]:
+    """Build order_items rows and the order total in a single pass."""
+    total = Decimal("0")
+    rows = []
+    for item in items:
+        price = catalog[item.course_id][0]
+        total += price * item.quantity
+        rows.append(
+            {"course_id": item.course_id, "quantity": item.quantity, "price": price})
+    return total, rows
+
+
+def _validate_bulk_order(
+    order: OrderCreate,
+    catalog: dict[int, tuple[Decimal, str]],
+    known_users: set[int],
+) -> str | None:
+    if not order.items:
+        return "Order must contain at least one item"
+    if order.user_id not in known_users:
+        return f"User {order.user_id} not found"
+    course_ids = [item.course_id for item in order.items]
+    if len(set(course_ids)) != len(course_ids):
+        return "Order contains duplicate courses"
+    missing, unpublished = _check_courses(course_ids, catalog)
+    if missing or unpublished:
+        return _courses_error(missing, unpublished)
+    return None
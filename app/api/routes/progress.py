@@ -0,0 +1,21 @@
+from fastapi import APIRouter, HTTPException, Response, status
+
+from app.db.progress_buffer import ProgressBufferFull, progress_buffer
+from app.schemas import ProgressEvent
+
+router = APIRouter(prefix="/progress", tags=["progress"])
+
+
+@router.post("", status_code=status.HTTP_202_ACCEPTED, response_class=Response)
+async def record_progress(payload: ProgressEvent) -> Response:
+    """Queue a progress heartbeat, it is written by the next buffer flush."""
+    try:
+        await progress_buffer.submit(
+            payload.enrollment_id, payload.lesson_id, payload.status, payload.score)
+    except ProgressBufferFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Progress buffer is full, retry later",
+            headers={"Retry-After": "1"},
+        )
+    return Response(status_code=status.HTTP_202_ACCEPTED)
@@ -1,17 +1,34 @@
+from collections.abc import Hashable
 from datetime import datetime, timedelta, timezone
+from typing import Any
 
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy import text
+from pydantic import BaseModel
+from sqlalchemy import TextClause, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_db
+from app.core.cache import SingleFlightCache
+from app.core.config import settings
 from app.schemas import SalesDynamicsItem, TopCourseItem, UserActivityItem
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
+# Keyed by (report, start, end[, limit]) with the bounds normalized to UTC.
+# Reports are not invalidated on writes, they are at most the TTL old.
+report_cache = SingleFlightCache(
+    "reports",
+    max_size=settings.report_cache_size,
+    ttl=settings.report_cache_ttl_seconds,
+)
+
+# Lower bound on the order month of payments in a report window (partition pruning).
+MAX_ORDER_AGE = timedelta(days=settings.payment_max_order_age_days)
+
 
 def default_period(days: int) -> tuple[datetime, datetime]:
-    now = datetime.now(timezone.utc)
+    # Rounded down to the minute so repeated default requests share a cache key.
+    now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
     return now - timedelta(days=days), now
 
 
@@ -22,14 +39,16 @@ async def top_courses_by_revenue(
     end: datetime | None = Query(default=None),
     limit: int = Query(default=10, ge=1, le=100),
 ) -> list[TopCourseItem]:
-    start_dt, end_dt = (start, end) if start and end else default_period(90)
-    result = await db.execute(
+    start_dt, end_dt = _period(start, end, 90)
+    return await _cached_report(
+        db,
+        ("top-courses", start_dt, end_dt, limit),
         text(
-            "SELECT * FROM fn_top_courses_by_revenue(:start_dt, :end_dt, :limit)"
+            "SELECT * FROM fn_top_courses_by_revenue(:start_dt, :end_dt, :limit, :max_order_age)"
         ),
-        {"start_dt": start_dt, "end_dt": end_dt, "limit": limit},
+        {"start_dt": start_dt, "end_dt": end_dt, "limit": limit, "max_order_age": MAX_ORDER_AGE},
+        TopCourseItem,
     )
-    return [TopCourseItem(**row._mapping) for row in result]
 
 
 @router.get("/user-activity", response_model=list[UserActivityItem])
@@ -38,12 +57,14 @@ async def user_activity(
     start: datetime | None = Query(default=None),
     end: datetime | None = Query(default=None),
 ) -> list[UserActivityItem]:
-    start_dt, end_dt = (start, end) if start and end else default_period(30)
-    result = await db.execute(
-        text("SELECT * FROM fn_user_activity(:start_dt, :end_dt)"),
-        {"start_dt": start_dt, "end_dt": end_dt},
+    start_dt, end_dt = _period(start, end, 30)
+    return await _cached_report(
+        db,
+        ("user-activity", start_dt, end_dt),
+        text("SELECT * FROM fn_user_activity(:start_dt, :end_dt, :max_order_age)"),
+        {"start_dt": start_dt, "end_dt": end_dt, "max_order_age": MAX_ORDER_AGE},
+        UserActivityItem,
     )
-    return [UserActivityItem(**row._mapping) for row in result]
 
 
 @router.get("/sales-dynamics", response_model=list[SalesDynamicsItem])
@@ -52,9 +73,39 @@ async def sales_dynamics(
     start: datetime | None = Query(default=None),
     end: datetime | None = Query(default=None),
 ) -> list[SalesDynamicsItem]:
-    start_dt, end_dt = (start, end) if start and end else default_period(180)
-    result = await db.execute(
-        text("SELECT * FROM fn_sales_dynamics(:start_dt, :end_dt)"),
-        {"start_dt": start_dt, "end_dt": end_dt},
+    start_dt, end_dt = _period(start, end, 180)
+    return await _cached_report(
+        db,
+        ("sales-dynamics", start_dt, end_dt),
+        text("SELECT * FROM fn_sales_dynamics(:start_dt, :end_dt, :max_order_age)"),
+        {"start_dt": start_dt, "end_dt": end_dt, "max_order_age": MAX_ORDER_AGE},
+        SalesDynamicsItem,
     )
-    return [SalesDynamicsItem(**row._mapping) for row in result]
+
+
+def _period(start: datetime | None, end: datetime | None, days: int) -> tuple[datetime, datetime]:
+    if not (start and end):
+        return default_period(days)
+    return _as_utc(start), _as_utc(end)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # The same instant sent with different offsets maps to one cache key,
+    # naive values are taken as UTC.
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+async def _cached_report(
+    db: AsyncSession,
+    key: Hashable,
+    query: TextClause,
+    params: dict[str, Any],
+    item_type: type[BaseModel],
+) -> list[Any]:
+    async def load() -> list[Any]:
+        result = await db.execute(query, params)
+        return [item_type(**row._mapping) for row in result]
+
+    return await report_cache.get_or_load(key, load)
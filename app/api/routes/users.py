@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from passlib.hash import bcrypt
-from sqlalchemy import select
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from app import models
 from app.api.deps import get_db
-from app.schemas import UserCreate, UserRead
+from app.api.pagination import decode_cursor, encode_cursor, split_page
+from app.core.security import password_hasher
+from app.schemas import OrderDetailRead, Page, UserBulkCreate, UserBulkResult, UserCreate, UserRead
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -16,7 +21,7 @@ async def create_user(payload: UserCreate, db: AsyncSession = Depends(get_db)) -
     user = models.User(
         email=payload.email,
         full_name=payload.full_name,
-        hashed_password=bcrypt.hash(payload.password),
+        hashed_password=await password_hasher.hash(payload.password),
         role_id=payload.role_id,
     )
     db.add(user)
@@ -29,7 +34,128 @@ async def create_user(payload: UserCreate, db: AsyncSession = Depends(get_db)) -
     return user
 
 
+@router.post("/bulk", response_model=UserBulkResult, status_code=status.HTTP_201_CREATED)
+async def create_users_bulk(payload: UserBulkCreate, db: AsyncSession = Depends(get_db)) -> UserBulkResult:
+    users: dict[str, UserCreate] = {}
+    for user in payload.users:
+        users.setdefault(user.email, user)
+    role_ids = {user.role_id for user in users.values()}
+    known_roles = set((await db.execute(
+        select(models.Role.id).where(models.Role.id.in_(role_ids)))).scalars())
+    if unknown := sorted(role_ids - known_roles):
+        raise HTTPException(status_code=422, detail=f"Unknown role_id: {unknown}")
+
+    # Skip hashing for emails that are already taken, ON CONFLICT covers races.
+    existing = set((await db.execute(
+        select(models.User.email).where(models.User.email.in_(users)))).scalars())
+    new_users = [user for email, user in users.items() if email not in existing]
+
+    created: list[models.User] = []
+    if new_users:
+        hashes = await password_hasher.hash_many([user.password for user in new_users])
+        stmt = (
+            insert(models.User)
+            .values([
+                {"email": user.email, "full_name": user.full_name,
+                 "hashed_password": hashed, "role_id": user.role_id}
+                for user, hashed in zip(new_users, hashes)
+            ])
+            .on_conflict_do_nothing(index_elements=[models.User.email])
+            .returning(models.User)
+        )
+        try:
+            created = list((await db.execute(stmt)).scalars())
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail="Failed to create users")
+
+    pending = {user.email for user in created}
+    skipped = []
+    for user in payload.users:
+        if user.email in pending:
+            pending.discard(user.email)
+        else:
+            skipped.append(user.email)
+    return UserBulkResult(created=created, skipped=skipped)
+
+
 @router.get("", response_model=list[UserRead])
 async def list_users(db: AsyncSession = Depends(get_db)) -> list[UserRead]:
     result = await db.execute(select(models.User))
     return result.scalars().all()
+
+
+@router.get("/search", response_model=Page[UserRead])
+async def search_users(
+    db: AsyncSession = Depends(get_db),
+    q: str = Query(min_length=1, max_length=255),
+    match: str = Query("prefix", pattern="^(prefix|substring)$"),
+    role_id: int | None = Query(default=None),
+    cursor: str | None = Query(default=None),
+    limit: int = Query(50, ge=1, le=200),
+) -> Page[UserRead]:
+    """Case-insensitive search by email or full name.
+
+    Prefix matches use the text_pattern_ops indexes, substring matches the
+    pg_trgm ones, which need at least three characters to be selective.
+    """
+    term = q.strip().lower()
+    if match == "substring" and len(term) < 3:
+        raise HTTPException(
+            status_code=422, detail="Substring search needs at least 3 characters")
+    columns = (func.lower(models.User.email), func.lower(models.User.full_name))
+    if match == "prefix":
+        conditions = [column.startswith(term, autoescape=True) for column in columns]
+    else:
+        conditions = [column.contains(term, autoescape=True) for column in columns]
+
+    query = select(models.User).where(or_(*conditions))
+    if role_id is not None:
+        query = query.where(models.User.role_id == role_id)
+    if cursor is not None:
+        (last_id,) = decode_cursor(cursor, int)
+        query = query.where(models.User.id > last_id)
+    query = query.order_by(models.User.id).limit(limit + 1)
+
+    result = await db.execute(query)
+    users, has_more = split_page(result.scalars().all(), limit)
+    next_cursor = encode_cursor(users[-1].id) if has_more else None
+    return Page[UserRead](items=users, next_cursor=next_cursor)
+
+
+@router.get("/{user_id}/orders", response_model=Page[OrderDetailRead])
+async def list_user_orders(
+    user_id: int,
+    db: AsyncSession = Depends(get_db),
+    cursor: str | None = Query(default=None),
+    limit: int = Query(20, ge=1, le=100),
+) -> Page[OrderDetailRead]:
+    if await db.get(models.User, user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    query = (
+        select(models.Order)
+        .where(models.Order.user_id == user_id)
+        .options(
+            selectinload(models.Order.items)
+            .selectinload(models.OrderItem.course)
+            .load_only(models.Course.id, models.Course.title),
+            selectinload(models.Order.payments),
+        )
+    )
+    if cursor is not None:
+        last_created, last_id = decode_cursor(
+            cursor, datetime.fromisoformat, int)
+        query = query.where(
+            tuple_(models.Order.created_at, models.Order.id) < tuple_(
+                last_created, last_id)
+        )
+    query = query.order_by(
+        models.Order.created_at.desc(), models.Order.id.desc()).limit(limit + 1)
+
+    result = await db.execute(query)
+    orders, has_more = split_page(result.scalars().all(), limit)
+    next_cursor = encode_cursor(
+        orders[-1].created_at, orders[-1].id) if has_more else None
+    return Page[OrderDetailRead](items=orders, next_cursor=next_cursor)
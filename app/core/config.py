@@ -20,6 +20,56 @@ class Settings(BaseSettings):
 
     log_level: str = "INFO"
 
+    idempotency_cache_size: int = 10000
+    # Stored Idempotency-Key responses older than this are treated as new keys
+    # and removed by scripts/purge_idempotency_keys.py.
+    idempotency_ttl_hours: int = 24
+
+    # "sync" updates course aggregates inside the writing transaction,
+    # "outbox" queues them for the background consumer.
+    aggregate_mode: str = "sync"
+    outbox_batch_size: int = 1000
+    outbox_poll_interval_ms: int = 500
+
+    course_cache_size: int = 512
+    course_cache_ttl_seconds: float = 30
+    course_cache_revalidate_ms: int = 1000
+    curriculum_cache_size: int = 1024
+    curriculum_cache_ttl_seconds: float = 300
+    report_cache_size: int = 256
+    report_cache_ttl_seconds: float = 60
+
+    # Payments are accepted for orders at most this old. Payments are
+    # partitioned by order month, so reports only read the partitions of
+    # orders from this long before the report window on.
+    payment_max_order_age_days: int = 30
+
+    # Rows fetched per round trip by streaming exports (server-side cursor).
+    export_batch_size: int = 1000
+
+    # POST /progress write-behind buffer (per worker).
+    progress_buffer_size: int = 10000
+    progress_flush_interval_ms: int = 500
+    progress_backpressure_timeout_ms: int = 1000
+    # Failed flushes are retried with exponential backoff up to this delay.
+    progress_flush_max_backoff_ms: int = 30000
+
+    # bcrypt process pool: 0 workers means one per CPU core.
+    password_hash_workers: int = 0
+    password_hash_max_pending: int = 64
+
+    # Monthly partitions are premade this many months ahead by a background
+    # check in every worker, months_ahead below the warning level is reported
+    # in /metrics/partitions (audit_log has no default partition).
+    partition_months_ahead: int = 12
+    partition_check_interval_seconds: float = 3600
+    partition_warn_months: int = 2
+
+    # audit_log partitions older than the retention are exported to
+    # gzip-compressed JSONL in the archive directory, then dropped.
+    audit_retention_months: int = 12
+    audit_archive_dir: str = "archive/audit_log"
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
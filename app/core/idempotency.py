@@ -0,0 +1,204 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import delete, select, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app import models
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    request_hash: str
+    status_code: int
+    body: Any
+    created_at: datetime
+
+
+def expired_before() -> datetime:
+    """Keys stored before this moment are past IDEMPOTENCY_TTL_HOURS."""
+    return datetime.now(timezone.utc) - timedelta(hours=settings.idempotency_ttl_hours)
+
+
+class ResponseCache:
+    """Bounded LRU of stored responses keyed by (scope, key), expired ones are misses."""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._items: OrderedDict[tuple[str, str], StoredResponse] = OrderedDict()
+
+    def get(self, cache_key: tuple[str, str]) -> StoredResponse | None:
+        stored = self._items.get(cache_key)
+        if stored is None:
+            return None
+        if stored.created_at < expired_before():
+            del self._items[cache_key]
+            return None
+        self._items.move_to_end(cache_key)
+        return stored
+
+    def put(self, cache_key: tuple[str, str], stored: StoredResponse) -> None:
+        self._items[cache_key] = stored
+        self._items.move_to_end(cache_key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+
+class KeyLocks:
+    """Per-key asyncio locks that are dropped once nobody holds or awaits them."""
+
+    def __init__(self) -> None:
+        self._locks: dict[tuple[str, str], tuple[asyncio.Lock, int]] = {}
+
+    @asynccontextmanager
+    async def hold(self, cache_key: tuple[str, str]) -> AsyncIterator[None]:
+        lock, users = self._locks.get(cache_key, (asyncio.Lock(), 0))
+        self._locks[cache_key] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[cache_key]
+            if users == 1:
+                del self._locks[cache_key]
+            else:
+                self._locks[cache_key] = (lock, users - 1)
+
+
+response_cache = ResponseCache(settings.idempotency_cache_size)
+key_locks = KeyLocks()
+
+
+class IdempotentCall:
+    def __init__(self, scope: str, key: str | None, request_hash: str) -> None:
+        self.scope = scope
+        self.key = key
+        self.request_hash = request_hash
+        self.replay: JSONResponse | None = None
+        self._pending: StoredResponse | None = None
+
+    def check(self, stored: StoredResponse | None) -> bool:
+        if stored is None:
+            return False
+        if stored.request_hash != self.request_hash:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used with a different payload",
+            )
+        self.replay = JSONResponse(
+            status_code=stored.status_code,
+            content=stored.body,
+            headers={"Idempotent-Replayed": "true"},
+        )
+        return True
+
+    async def save(self, db: AsyncSession, status_code: int, body: BaseModel) -> None:
+        """Store the response in the caller's transaction; call right before commit."""
+        if self.key is None:
+            return
+        response = body.model_dump(mode="json")
+        created_at = await db.scalar(
+            insert(models.IdempotencyKey).values(
+                scope=self.scope,
+                key=self.key,
+                request_hash=self.request_hash,
+                status_code=status_code,
+                response=response,
+            ).returning(models.IdempotencyKey.created_at)
+        )
+        self._pending = StoredResponse(self.request_hash, status_code, response, created_at)
+
+    def committed(self) -> None:
+        if self.key is not None and self._pending is not None:
+            response_cache.put((self.scope, self.key), self._pending)
+
+
+@asynccontextmanager
+async def idempotent(
+    db: AsyncSession, scope: str, key: str | None, payload: BaseModel
+) -> AsyncIterator[IdempotentCall]:
+    """Serialize requests that share an Idempotency-Key and replay stored results.
+
+    Concurrent duplicates wait on an in-process lock and, across workers, on a
+    transaction-scoped advisory lock, so only the first one performs the write.
+    """
+    request_hash = hashlib.sha256(
+        payload.model_dump_json().encode("utf-8")).hexdigest()
+    call = IdempotentCall(scope, key, request_hash)
+    if key is None:
+        yield call
+        return
+
+    cache_key = (scope, key)
+    if call.check(response_cache.get(cache_key)):
+        yield call
+        return
+
+    async with key_locks.hold(cache_key):
+        if call.check(response_cache.get(cache_key)):
+            yield call
+            return
+        await db.execute(
+            text("SELECT pg_advisory_xact_lock(hashtextextended(:lock_key, 0))"),
+            {"lock_key": f"{scope}:{key}"},
+        )
+        row = await db.scalar(
+            select(models.IdempotencyKey).where(
+                models.IdempotencyKey.scope == scope,
+                models.IdempotencyKey.key == key,
+            )
+        )
+        if row is not None and row.created_at < expired_before():
+            # Expired but not purged yet: the key starts over as a new one.
+            await db.delete(row)
+            await db.flush()
+        elif row is not None:
+            stored = StoredResponse(
+                row.request_hash, row.status_code, row.response, row.created_at)
+            response_cache.put(cache_key, stored)
+            await db.rollback()
+            call.check(stored)
+        try:
+            yield call
+        finally:
+            if db.in_transaction():
+                await db.rollback()
+        call.committed()
+
+
+async def purge_expired_keys(engine: AsyncEngine, before: datetime, batch_size: int) -> int:
+    """Delete keys created before `before`, oldest first, in batches of `batch_size`.
+
+    Each batch is its own transaction and is found through ix_idempotency_keys_created_at.
+    Rows locked by a request that is replacing an expired key (see idempotent) are
+    skipped rather than waited for, and left to the next run.
+    """
+    expired = (
+        select(models.IdempotencyKey.scope, models.IdempotencyKey.key)
+        .where(models.IdempotencyKey.created_at < before)
+        .order_by(models.IdempotencyKey.created_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    purged = 0
+    while True:
+        async with engine.begin() as conn:
+            result = await conn.execute(
+                delete(models.IdempotencyKey).where(
+                    tuple_(models.IdempotencyKey.scope, models.IdempotencyKey.key).in_(expired)
+                )
+            )
+        purged += result.rowcount
+        if result.rowcount < batch_size:
+            return purged
@@ -0,0 +1,82 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from passlib.hash import bcrypt
+
+from app.core.config import settings
+
+
+def _hash_password(password: str) -> tuple[str, float]:
+    """Runs in a pool process, returns the hash and the time spent hashing."""
+    started = time.perf_counter()
+    hashed = bcrypt.hash(password)
+    return hashed, time.perf_counter() - started
+
+
+class PasswordHasher:
+    """bcrypt hashing in a process pool, off the event loop.
+
+    At most `max_pending` hashes are submitted to the pool at once, further
+    callers wait on a semaphore. Queue time (semaphore wait plus pool backlog)
+    and hashing time are tracked separately.
+    """
+
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self.hashed_total = 0
+        self.waiting = 0
+        self.in_flight = 0
+        self.queue_seconds_total = 0.0
+        self.queue_seconds_max = 0.0
+        self.hash_seconds_total = 0.0
+        self._slots = asyncio.Semaphore(max_pending)
+        self._pool: ProcessPoolExecutor | None = None
+
+    async def hash(self, password: str) -> str:
+        if self._pool is None:
+            # spawn: forking a process that runs an event loop and DB connections is unsafe.
+            self._pool = ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context("spawn"))
+        started = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            hashed, hash_seconds = await asyncio.get_running_loop().run_in_executor(
+                self._pool, _hash_password, password)
+        except BrokenProcessPool:
+            # A worker died, start a fresh pool for the next call.
+            self.shutdown()
+            raise
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+        queue_seconds = time.perf_counter() - started - hash_seconds
+        self.hashed_total += 1
+        self.hash_seconds_total += hash_seconds
+        self.queue_seconds_total += queue_seconds
+        self.queue_seconds_max = max(self.queue_seconds_max, queue_seconds)
+        return hashed
+
+    async def hash_many(self, passwords: list[str]) -> list[str]:
+        return list(await asyncio.gather(*(self.hash(password) for password in passwords)))
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+password_hasher = PasswordHasher(
+    settings.password_hash_workers or os.cpu_count() or 1,
+    settings.password_hash_max_pending,
+)
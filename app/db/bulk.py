@@ -0,0 +1,22 @@
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def copy_records(
+    session: AsyncSession,
+    table_name: str,
+    columns: Sequence[str],
+    records: Iterable[Sequence[Any]],
+) -> None:
+    """Stream rows into a table with COPY inside the session's transaction.
+
+    The session must already have executed a statement, so that the
+    transaction is open on the underlying asyncpg connection.
+    """
+    conn = await session.connection()
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        table_name, columns=list(columns), records=records
+    )
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxConsumer:
+    """Background task that applies queued course aggregate deltas in batches."""
+
+    def __init__(self, batch_size: int, poll_interval: float) -> None:
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.processed_total = 0
+        self.last_drain_at: datetime | None = None
+        self._task: asyncio.Task | None = None
+
+    async def drain_once(self) -> int | None:
+        """Consume one batch; None means another session is draining."""
+        async with engine.begin() as conn:
+            consumed = await conn.scalar(
+                text("SELECT fn_drain_aggregate_outbox(:limit)"),
+                {"limit": self.batch_size},
+            )
+        if consumed is not None:
+            self.processed_total += consumed
+            self.last_drain_at = datetime.now(timezone.utc)
+        return consumed
+
+    async def flush(self) -> int:
+        """Drain synchronously until the outbox is empty (used by tests and shutdown)."""
+        total = 0
+        while True:
+            consumed = await self.drain_once()
+            if consumed is None:
+                await asyncio.sleep(0.05)
+                continue
+            if consumed == 0:
+                return total
+            total += consumed
+
+    async def run(self) -> None:
+        while True:
+            try:
+                consumed = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Aggregate outbox drain failed")
+                consumed = 0
+            if consumed != self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.flush()
+
+
+async def outbox_lag() -> dict[str, float | int]:
+    """Pending events and age of the oldest one, in seconds."""
+    async with engine.connect() as conn:
+        row = (
+            await conn.execute(
+                text(
+                    "SELECT COUNT(*) AS pending,"
+                    " COALESCE(EXTRACT(EPOCH FROM now() - MIN(created_at)), 0) AS lag_seconds"
+                    " FROM aggregate_outbox"
+                )
+            )
+        ).one()
+    return {"pending": row.pending, "lag_seconds": float(row.lag_seconds)}
+
+
+outbox_consumer = OutboxConsumer(
+    settings.outbox_batch_size, settings.outbox_poll_interval_ms / 1000)
@@ -0,0 +1,282 @@
+import asyncio
+import gzip
+import logging
+import os
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.core.config import settings
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+# Referencing tables come first: a partition of orders can only be detached
+# once no order_items/payments rows point at it.
+PARTITIONED_TABLES = ("payments", "order_items", "orders")
+
+# Partitioned as well, but expired months are archived (archive_partitions)
+# rather than detached, and on a retention of their own. It has no default
+# partition, so months can be detached CONCURRENTLY, and writes to audited
+# tables fail past its last month: PartitionMaintainer keeps months premade.
+AUDIT_TABLE = "audit_log"
+
+
+async def ensure_partitions(
+    conn: AsyncConnection, months_ahead: int, months_back: int = 0
+) -> list[str]:
+    """Make sure monthly partitions exist around the current month, return their names."""
+    created: list[str] = []
+    for table in (*PARTITIONED_TABLES, AUDIT_TABLE):
+        result = await conn.execute(
+            text("SELECT fn_ensure_partitions(:table, :ahead, :back, :with_default)"),
+            {"table": table, "ahead": months_ahead, "back": months_back,
+             "with_default": table != AUDIT_TABLE},
+        )
+        created.extend(result.scalars())
+    return created
+
+
+async def partition_horizons(conn: AsyncConnection) -> dict[str, date | None]:
+    """First day without a month partition, per partitioned table."""
+    horizons: dict[str, date | None] = {}
+    for table in (*PARTITIONED_TABLES, AUDIT_TABLE):
+        horizons[table] = await conn.scalar(
+            text("SELECT fn_partition_horizon(:table)"), {"table": table})
+    return horizons
+
+
+def months_ahead(horizon: date | None, today: date) -> int:
+    """Whole months covered by partitions after the current one."""
+    if horizon is None:
+        return -1
+    return (horizon.year - today.year) * 12 + horizon.month - today.month - 1
+
+
+class PartitionMaintainer:
+    """Background task that keeps monthly partitions premade.
+
+    Every check interval it creates missing partitions up to `months_ahead`
+    months after the current one (one worker at a time, under an advisory
+    lock) and records how far each table is covered. A table covered for
+    fewer than `warn_months` is logged and flagged in /metrics/partitions.
+    """
+
+    def __init__(self, months_ahead: int, check_interval: float, warn_months: int) -> None:
+        self.months_ahead = months_ahead
+        self.check_interval = check_interval
+        self.warn_months = warn_months
+        self.horizons: dict[str, date | None] = {}
+        self.last_check_at: datetime | None = None
+        self._task: asyncio.Task | None = None
+
+    def warnings(self) -> list[str]:
+        today = datetime.now(timezone.utc).date()
+        return [
+            table for table, horizon in self.horizons.items()
+            if months_ahead(horizon, today) < self.warn_months
+        ]
+
+    async def check_once(self) -> None:
+        """Create missing partitions and refresh the horizons."""
+        async with engine.begin() as conn:
+            # A partition is created under a lock on the parent: give up rather
+            # than queue writes behind it, the next check retries.
+            await conn.execute(text("SET LOCAL lock_timeout = '2s'"))
+            await conn.execute(
+                text("SELECT pg_advisory_xact_lock(hashtext('fn_ensure_partitions'))"))
+            await ensure_partitions(conn, self.months_ahead)
+            self.horizons = await partition_horizons(conn)
+        self.last_check_at = datetime.now(timezone.utc)
+
+    async def run(self) -> None:
+        while True:
+            previous = self.horizons
+            try:
+                await self.check_once()
+                if self.horizons != previous:
+                    logger.info("Month partitions premade until %s", self.horizons)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Partition check failed")
+            for table in self.warnings():
+                logger.warning(
+                    "%s has month partitions only until %s",
+                    table, self.horizons[table])
+            await asyncio.sleep(self.check_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+async def detach_partitions(conn: AsyncConnection, before: date, drop: bool = False) -> list[str]:
+    """Detach (optionally drop) monthly partitions that end on or before `before`."""
+    detached: list[str] = []
+    for table in PARTITIONED_TABLES:
+        result = await conn.execute(
+            text("SELECT fn_detach_partitions(:table, :before, :drop)"),
+            {"table": table, "before": before, "drop": drop},
+        )
+        detached.extend(result.scalars())
+    return detached
+
+
+async def archive_partitions(
+    engine: AsyncEngine, table: str, before: date, directory: Path, batch_size: int
+) -> list[Path]:
+    """Export monthly partitions that end on or before `before` to
+    `<directory>/<partition>.jsonl.gz`, one JSON object per row, then drop them.
+
+    Each partition is exported in one transaction that blocks writes to it,
+    through a server-side cursor into a temporary file that is fsynced and
+    renamed. Only then is it detached CONCURRENTLY in autocommit (the parent
+    stays writable) and dropped. Rows that reached the partition between the
+    export and the detach are caught by a recount and exported again.
+
+    A leftover `<table>_default` partition rules out concurrent detaches: its
+    expired rows are archived and deleted, and it is dropped once empty. Months
+    a previous run detached but did not drop are archived and dropped as well.
+    """
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text("SELECT fn_expired_partitions(:table, :before)"),
+            {"table": table, "before": before},
+        )
+        names = list(result.scalars())
+        result = await conn.execute(
+            text("SELECT fn_detached_expired_partitions(:table, :before)"),
+            {"table": table, "before": before},
+        )
+        detached = list(result.scalars())
+        has_default = (await conn.execute(
+            text("SELECT to_regclass(:name) IS NOT NULL"), {"name": f"{table}_default"},
+        )).scalar_one()
+
+    directory.mkdir(parents=True, exist_ok=True)
+    archived: list[Path] = []
+    if has_default:
+        path = directory / f"{table}_default_before_{before:%Y%m}.jsonl.gz"
+        if await _archive_default(engine, table, before, path, batch_size):
+            archived.append(path)
+
+    for name in [*detached, *names]:
+        path = directory / f"{name}.jsonl.gz"
+        exported = None
+        if name not in detached:
+            async with engine.begin() as conn:
+                exported = await _export_rows(conn, table, name, path, batch_size)
+            await _detach_concurrently(engine, table, name)
+        async with engine.begin() as conn:
+            remaining = await conn.scalar(
+                text("SELECT fn_table_row_count(:name)"), {"name": name})
+            if remaining != exported:
+                # The detached table no longer receives rows, this export is final.
+                await _export_rows(conn, table, name, path, batch_size)
+            await conn.execute(
+                text("SELECT fn_drop_detached_partition(:table, :name)"),
+                {"table": table, "name": name},
+            )
+        archived.append(path)
+    return archived
+
+
+async def _export_rows(
+    conn: AsyncConnection, table: str, name: str, path: Path, batch_size: int,
+    before: date | None = None,
+) -> int:
+    """Write the rows of `name` (those before `before`, if given) to a gzip JSONL
+    file, return their count.
+
+    Runs in the caller's transaction, which keeps `name` write-locked until it ends.
+    """
+    partial = path.with_name(path.name + ".part")
+    exported = 0
+    await conn.execute(
+        text("SELECT fn_open_archive_cursor(:table, :name, :before)"),
+        {"table": table, "name": name, "before": before},
+    )
+    fetch = text("SELECT fn_fetch_archive_rows(:count)")
+    try:
+        with open(partial, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as archive:
+                while True:
+                    rows = (await conn.execute(fetch, {"count": batch_size})).scalars().all()
+                    if not rows:
+                        break
+                    archive.write("".join(f"{row}\n" for row in rows).encode())
+                    exported += len(rows)
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(partial, path)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    await conn.execute(text("CLOSE archive_rows"))
+    return exported
+
+
+async def _detach_concurrently(engine: AsyncEngine, table: str, name: str) -> None:
+    # The statement is built by fn_detach_partition_concurrently_sql: it cannot run
+    # inside a function or a transaction block, so it is executed here in autocommit.
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        statement = await conn.scalar(
+            text("SELECT fn_detach_partition_concurrently_sql(:table, :name)"),
+            {"table": table, "name": name},
+        )
+        if statement is not None:
+            await conn.exec_driver_sql(statement)
+
+
+async def _archive_default(
+    engine: AsyncEngine, table: str, before: date, path: Path, batch_size: int
+) -> bool:
+    """Archive and delete expired rows of the default partition, drop it once empty.
+
+    Raises RuntimeError when newer rows remain there: month partitions cannot
+    be detached concurrently while a default partition exists.
+    """
+    default = f"{table}_default"
+    async with engine.begin() as conn:
+        exported = await _export_rows(conn, table, default, path, batch_size, before)
+        remaining = await conn.scalar(
+            text("SELECT fn_purge_default_partition(:table, :before)"),
+            {"table": table, "before": before},
+        )
+    if remaining:
+        raise RuntimeError(
+            f"{default} still holds {remaining} row(s) newer than {before}, move them "
+            f"into month partitions: {table} months cannot be detached concurrently "
+            f"while a default partition exists")
+    async with engine.begin() as conn:
+        # One-off for tables created with a default partition. lock_timeout keeps
+        # the brief parent lock from queueing writes if it cannot be taken at once.
+        await conn.execute(text("SET LOCAL lock_timeout = '2s'"))
+        await conn.execute(
+            text("SELECT fn_detach_partition(:table, :name, true)"),
+            {"table": table, "name": default},
+        )
+    if not exported:
+        path.unlink(missing_ok=True)
+    return bool(exported)
+
+
+partition_maintainer = PartitionMaintainer(
+    settings.partition_months_ahead,
+    settings.partition_check_interval_seconds,
+    settings.partition_warn_months,
+)
@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+# One statement per flush: the batch travels as column arrays, rows whose
+# enrollment/lesson do not exist (or do not belong together) are dropped by the
+# joins, and updates older than the stored row are ignored. A completed lesson
+# stays completed when late heartbeats arrive.
+UPSERT_PROGRESS_SQL = text(
+    """
+    INSERT INTO progresses (enrollment_id, lesson_id, status, score, completed_at, updated_at)
+    SELECT p.enrollment_id, p.lesson_id, p.status, p.score, p.completed_at, p.updated_at
+    FROM unnest(
+        CAST(:enrollment_ids AS BIGINT[]),
+        CAST(:lesson_ids AS BIGINT[]),
+        CAST(:statuses AS VARCHAR[]),
+        CAST(:scores AS INTEGER[]),
+        CAST(:completed_ats AS TIMESTAMPTZ[]),
+        CAST(:updated_ats AS TIMESTAMPTZ[])
+    ) AS p(enrollment_id, lesson_id, status, score, completed_at, updated_at)
+    JOIN enrollments e ON e.id = p.enrollment_id
+    JOIN lessons l ON l.id = p.lesson_id AND l.course_id = e.course_id
+    ORDER BY p.enrollment_id, p.lesson_id
+    ON CONFLICT ON CONSTRAINT uq_progresses_enrollment_lesson DO UPDATE
+    SET status = CASE WHEN progresses.status = 'completed' THEN 'completed' ELSE EXCLUDED.status END,
+        score = COALESCE(EXCLUDED.score, progresses.score),
+        completed_at = COALESCE(progresses.completed_at, EXCLUDED.completed_at),
+        updated_at = EXCLUDED.updated_at
+    WHERE progresses.updated_at <= EXCLUDED.updated_at
+    """
+)
+
+ProgressKey = tuple[int, int]
+
+
+class ProgressBufferFull(Exception):
+    """No room freed up in the buffer within the backpressure timeout."""
+
+
+class ProgressBuffer:
+    """Write-behind buffer for lesson progress heartbeats.
+
+    Events are coalesced per (enrollment_id, lesson_id), only the latest state
+    is kept, and a background task upserts everything pending in one statement
+    every flush interval. A full buffer triggers an early flush and makes new
+    keys wait up to `wait_timeout` for room before ProgressBufferFull.
+
+    Rows of a flush in progress still count against `max_pending`, so a failing
+    database keeps the buffer full instead of letting requeued batches grow it.
+    Failed batches are requeued and retried with exponential backoff (up to
+    `max_backoff`), while new keys get ProgressBufferFull once it is full.
+    """
+
+    def __init__(
+        self, max_pending: int, flush_interval: float, wait_timeout: float, max_backoff: float
+    ) -> None:
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.wait_timeout = wait_timeout
+        self.max_backoff = max_backoff
+        self.accepted = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.flushed = 0
+        self.discarded = 0
+        self.failed_flushes = 0
+        self.last_flush_at: datetime | None = None
+        self.last_flush_seconds = 0.0
+        self._pending: dict[ProgressKey, dict] = {}
+        self._in_flight = 0
+        self.consecutive_failures = 0
+        self._space = asyncio.Condition()
+        self._flush_requested = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _full(self) -> bool:
+        return len(self._pending) + self._in_flight >= self.max_pending
+
+    async def submit(
+        self, enrollment_id: int, lesson_id: int, status: str, score: int | None
+    ) -> None:
+        now = datetime.now(timezone.utc)
+        key = (enrollment_id, lesson_id)
+        if key not in self._pending and self._full():
+            self._flush_requested.set()
+            async with self._space:
+                try:
+                    await asyncio.wait_for(
+                        self._space.wait_for(
+                            lambda: key in self._pending or not self._full()),
+                        self.wait_timeout,
+                    )
+                except asyncio.TimeoutError:
+                    self.rejected += 1
+                    raise ProgressBufferFull from None
+
+        row = {
+            "status": status,
+            "score": score,
+            "completed_at": now if status == "completed" else None,
+            "updated_at": now,
+        }
+        previous = self._pending.get(key)
+        if previous is not None:
+            # Same merge rules as the upsert.
+            self.coalesced += 1
+            if previous["status"] == "completed":
+                row["status"] = "completed"
+                row["completed_at"] = previous["completed_at"]
+            if score is None:
+                row["score"] = previous["score"]
+        self.accepted += 1
+        self._pending[key] = row
+        if self._full():
+            self._flush_requested.set()
+
+    async def flush(self) -> int:
+        """Upsert everything pending, return the number of rows written."""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            self._in_flight = len(batch)
+
+            started = time.perf_counter()
+            keys = sorted(batch)
+            rows = [batch[key] for key in keys]
+            try:
+                async with engine.begin() as conn:
+                    result = await conn.execute(
+                        UPSERT_PROGRESS_SQL,
+                        {
+                            "enrollment_ids": [key[0] for key in keys],
+                            "lesson_ids": [key[1] for key in keys],
+                            "statuses": [row["status"] for row in rows],
+                            "scores": [row["score"] for row in rows],
+                            "completed_ats": [row["completed_at"] for row in rows],
+                            "updated_ats": [row["updated_at"] for row in rows],
+                        },
+                    )
+            except Exception:
+                self.failed_flushes += 1
+                self.consecutive_failures += 1
+                self._requeue(batch)
+                logger.exception(
+                    "Progress buffer flush of %d rows failed (%d in a row), requeued",
+                    len(batch), self.consecutive_failures)
+                raise
+            except BaseException:
+                self._requeue(batch)
+                raise
+            finally:
+                self._in_flight = 0
+                async with self._space:
+                    self._space.notify_all()
+
+            self.consecutive_failures = 0
+            written = result.rowcount
+            self.flushed += written
+            self.discarded += len(keys) - written
+            self.last_flush_at = datetime.now(timezone.utc)
+            self.last_flush_seconds = time.perf_counter() - started
+            return written
+
+    def _requeue(self, batch: dict[ProgressKey, dict]) -> None:
+        # Put the batch back unless a newer event for the key arrived meanwhile.
+        for key, row in batch.items():
+            self._pending.setdefault(key, row)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Already logged by flush(). Back off: 1, 2, 4... flush intervals
+                # (the exponent is capped so a long outage cannot overflow it).
+                await asyncio.sleep(min(
+                    self.flush_interval * 2 ** min(self.consecutive_failures - 1, 20),
+                    self.max_backoff))
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+progress_buffer = ProgressBuffer(
+    settings.progress_buffer_size,
+    settings.progress_flush_interval_ms / 1000,
+    settings.progress_backpressure_timeout_ms / 1000,
+    settings.progress_flush_max_backoff_ms / 1000,
+)
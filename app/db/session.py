@@ -5,7 +5,12 @@ from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_asyn
 from app.core.config import settings
 
 engine = create_async_engine(
-    settings.sqlalchemy_database_uri, echo=False, future=True)
+    settings.sqlalchemy_database_uri,
+    echo=False,
+    future=True,
+    connect_args={"server_settings": {
+        "app.aggregate_mode": settings.aggregate_mode}},
+)
 SessionLocal = async_sessionmaker(
     bind=engine, expire_on_commit=False, class_=AsyncSession)
 
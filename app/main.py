@@ -1,8 +1,12 @@
 from fastapi import FastAPI
 
-from app.api.routes import courses, enrollments, orders, reports, reviews, users, imports
+from app.api.routes import audit, courses, enrollments, orders, progress, reports, reviews, users, imports, metrics
 from app.core.config import settings
+from app.core.security import password_hasher
 from app.db.init_db import init_db
+from app.db.outbox import outbox_consumer
+from app.db.partitions import partition_maintainer
+from app.db.progress_buffer import progress_buffer
 
 
 def create_application() -> FastAPI:
@@ -33,16 +37,30 @@ def register_events(app: FastAPI) -> None:
     @app.on_event("startup")
     async def on_startup() -> None:
         await init_db()
+        partition_maintainer.start()
+        progress_buffer.start()
+        if settings.aggregate_mode == "outbox":
+            outbox_consumer.start()
+
+    @app.on_event("shutdown")
+    async def on_shutdown() -> None:
+        await partition_maintainer.stop()
+        await progress_buffer.stop()
+        await outbox_consumer.stop()
+        password_hasher.shutdown()
 
 
 def register_routes(app: FastAPI) -> None:
     app.include_router(users.router, prefix="/api")
     app.include_router(courses.router, prefix="/api")
     app.include_router(enrollments.router, prefix="/api")
+    app.include_router(progress.router, prefix="/api")
     app.include_router(orders.router, prefix="/api")
     app.include_router(reviews.router, prefix="/api")
     app.include_router(reports.router, prefix="/api")
     app.include_router(imports.router, prefix="/api")
+    app.include_router(metrics.router, prefix="/api")
+    app.include_router(audit.router, prefix="/api")
 
 
 app = create_application()
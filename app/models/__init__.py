@@ -1,8 +1,10 @@
 from app.models.audit import AuditLog
 from app.models.course import Course, CourseModule, Lesson
 from app.models.enrollment import Enrollment, Progress
+from app.models.idempotency import IdempotencyKey
 from app.models.import_job import ImportJob, ImportJobError
 from app.models.order import Order, OrderItem, Payment
+from app.models.outbox import AggregateOutbox
 from app.models.review import Review
 from app.models.user import Role, User
 
@@ -19,6 +21,8 @@ __all__ = [
     "Payment",
     "Review",
     "AuditLog",
+    "IdempotencyKey",
+    "AggregateOutbox",
     "ImportJob",
     "ImportJobError",
 ]
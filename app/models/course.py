@@ -4,6 +4,7 @@ from decimal import Decimal
 from sqlalchemy import (
     BigInteger,
     CheckConstraint,
+    Computed,
     DateTime,
     ForeignKey,
     Index,
@@ -12,7 +13,9 @@ from sqlalchemy import (
     String,
     Text,
     UniqueConstraint,
+    text,
 )
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 
@@ -27,6 +30,21 @@ class Course(Base):
             "status IN ('draft','published','archived')",
             name="ck_courses_status_valid",
         ),
+        Index("ix_courses_updated_at", "updated_at"),
+        Index("ix_courses_search_vector", "search_vector",
+              postgresql_using="gin"),
+        # Keyset orderings of GET /courses: (sort key, id). Aggregate sort
+        # keys are only indexed for published courses, which is the catalog.
+        Index("ix_courses_created_at_id", "created_at", "id"),
+        Index("ix_courses_author_created_at", "author_id", "created_at", "id"),
+        Index("ix_courses_published_price", "price", "id",
+              postgresql_where=text("status = 'published'")),
+        Index("ix_courses_published_avg_rating", "avg_rating", "id",
+              postgresql_where=text("status = 'published'")),
+        Index("ix_courses_published_enrollments", "enrollments_count", "id",
+              postgresql_where=text("status = 'published'")),
+        Index("ix_courses_published_revenue", "total_revenue", "id",
+              postgresql_where=text("status = 'published'")),
     )
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
@@ -37,14 +55,39 @@ class Course(Base):
         String(20), nullable=False, server_default="draft")
     author_id: Mapped[int | None] = mapped_column(
         ForeignKey("users.id", ondelete="SET NULL"))
-    avg_rating: Mapped[Decimal] = mapped_column(
-        Numeric(3, 2), nullable=False, server_default="0")
+    # Running rating state kept by the reviews trigger, avg_rating is derived.
+    rating_sum: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default="0")
     reviews_count: Mapped[int] = mapped_column(
         Integer, nullable=False, server_default="0")
+    # Number of 1..5 star reviews, element i is the count of rating i.
+    rating_counts: Mapped[list[int]] = mapped_column(
+        ARRAY(Integer), nullable=False, server_default="{0,0,0,0,0}")
+    avg_rating: Mapped[Decimal] = mapped_column(
+        Numeric(3, 2),
+        Computed(
+            "CASE WHEN reviews_count > 0 "
+            "THEN (rating_sum::NUMERIC / reviews_count)::NUMERIC(3,2) ELSE 0 END",
+            persisted=True,
+        ),
+        nullable=False,
+    )
     enrollments_count: Mapped[int] = mapped_column(
         Integer, nullable=False, server_default="0")
     total_revenue: Mapped[Decimal] = mapped_column(
         Numeric(12, 2), nullable=False, server_default="0")
+    curriculum_version: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default="0")
+    # Kept by triggers on lessons and enrollments (progress roll-up).
+    lessons_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default="0")
+    lessons_started_total: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default="0")
+    lessons_completed_total: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default="0")
+    # Progress rows of any status, not_started included.
+    lessons_tracked_total: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default="0")
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
@@ -54,6 +97,15 @@ class Course(Base):
         onupdate=func.now(),
         nullable=False,
     )
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(description, '')), 'B')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
 
     author: Mapped["User"] = relationship(back_populates="courses")
     modules: Mapped[list["CourseModule"]] = relationship(
@@ -26,6 +26,9 @@ class Enrollment(Base):
             name="ck_enrollments_status_valid",
         ),
         Index("ix_enrollments_user_course", "user_id", "course_id"),
+        Index("ix_enrollments_created_at", "created_at", "id"),
+        Index("ix_enrollments_course_created_at",
+              "course_id", "created_at", "id"),
     )
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
@@ -39,6 +42,16 @@ class Enrollment(Base):
         DateTime(timezone=True))
     completed_at: Mapped[datetime | None] = mapped_column(
         DateTime(timezone=True))
+    # Kept by triggers on progresses and lessons.
+    lessons_total: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default="0")
+    lessons_started: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default="0")
+    lessons_completed: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default="0")
+    # Progress rows of any status, not_started included.
+    lessons_tracked: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default="0")
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
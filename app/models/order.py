@@ -6,6 +6,7 @@ from sqlalchemy import (
     CheckConstraint,
     DateTime,
     ForeignKey,
+    ForeignKeyConstraint,
     Index,
     Integer,
     Numeric,
@@ -18,6 +19,11 @@ from sqlalchemy.sql import func
 
 from app.db.base import Base
 
+# orders, order_items and payments are range-partitioned by month (see
+# fn_ensure_partitions in sql/002_functions_triggers_views.sql). Partition keys
+# have to be part of every unique constraint, so rows referencing an order
+# carry its created_at and the ORM identity stays on `id` alone.
+
 
 class Order(Base):
     __tablename__ = "orders"
@@ -26,10 +32,13 @@ class Order(Base):
             "status IN ('pending','paid','cancelled','refunded')",
             name="ck_orders_status_valid",
         ),
-        Index("ix_orders_user_created", "user_id", "created_at"),
+        Index("ix_orders_user_created", "user_id", "created_at", "id"),
+        Index("ix_orders_created_id", "created_at", "id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
     )
 
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    id: Mapped[int] = mapped_column(
+        BigInteger, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey(
         "users.id", ondelete="CASCADE"), nullable=False)
     status: Mapped[str] = mapped_column(
@@ -37,9 +46,11 @@ class Order(Base):
     total_amount: Mapped[Decimal] = mapped_column(
         Numeric(12, 2), nullable=False, server_default="0")
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), nullable=False
+        DateTime(timezone=True), server_default=func.now(), primary_key=True
     )
 
+    __mapper_args__ = {"primary_key": [id], "eager_defaults": True}
+
     user: Mapped["User"] = relationship(back_populates="orders")
     items: Mapped[list["OrderItem"]] = relationship(
         back_populates="order", cascade="all, delete-orphan")
@@ -54,14 +65,22 @@ class OrderItem(Base):
             "quantity > 0", name="ck_order_items_quantity_positive"),
         CheckConstraint(
             "price >= 0", name="ck_order_items_price_non_negative"),
-        UniqueConstraint("order_id", "course_id",
+        UniqueConstraint("order_id", "order_created_at", "course_id",
                          name="uq_order_items_order_course_unique"),
+        ForeignKeyConstraint(
+            ["order_id", "order_created_at"],
+            ["orders.id", "orders.created_at"],
+            ondelete="CASCADE",
+            name="fk_order_items_order",
+        ),
+        {"postgresql_partition_by": "RANGE (order_created_at)"},
     )
 
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
-    order_id: Mapped[int] = mapped_column(
-        ForeignKey("orders.id", ondelete="CASCADE"), nullable=False
-    )
+    id: Mapped[int] = mapped_column(
+        BigInteger, primary_key=True, autoincrement=True)
+    order_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    order_created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True)
     course_id: Mapped[int] = mapped_column(
         ForeignKey("courses.id", ondelete="RESTRICT"), nullable=False
     )
@@ -70,11 +89,16 @@ class OrderItem(Base):
     price: Mapped[Decimal] = mapped_column(
         Numeric(10, 2), nullable=False, server_default="0")
 
+    __mapper_args__ = {"primary_key": [id]}
+
     order: Mapped["Order"] = relationship(back_populates="items")
     course: Mapped["Course"] = relationship(back_populates="order_items")
 
 
 class Payment(Base):
+    """Partitioned by the order's created_at like order_items, so an orders
+    month detaches together with all of its payments, paid or not."""
+
     __tablename__ = "payments"
     __table_args__ = (
         CheckConstraint("amount >= 0", name="ck_payments_amount_non_negative"),
@@ -82,13 +106,22 @@ class Payment(Base):
             "status IN ('pending','paid','failed','refunded')",
             name="ck_payments_status_valid",
         ),
+        ForeignKeyConstraint(
+            ["order_id", "order_created_at"],
+            ["orders.id", "orders.created_at"],
+            ondelete="CASCADE",
+            name="fk_payments_order",
+        ),
         Index("ix_payments_order_status", "order_id", "status"),
+        Index("ix_payments_paid_at", "paid_at"),
+        {"postgresql_partition_by": "RANGE (order_created_at)"},
     )
 
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
-    order_id: Mapped[int] = mapped_column(
-        ForeignKey("orders.id", ondelete="CASCADE"), nullable=False
-    )
+    id: Mapped[int] = mapped_column(
+        BigInteger, primary_key=True, autoincrement=True)
+    order_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    order_created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True)
     amount: Mapped[Decimal] = mapped_column(
         Numeric(12, 2), nullable=False, server_default="0")
     status: Mapped[str] = mapped_column(
@@ -100,4 +133,6 @@ class Payment(Base):
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
 
+    __mapper_args__ = {"primary_key": [id]}
+
     order: Mapped["Order"] = relationship(back_populates="payments")
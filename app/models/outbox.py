@@ -0,0 +1,24 @@
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import BigInteger, DateTime, Numeric
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class AggregateOutbox(Base):
+    """Pending course aggregate changes, written by triggers in outbox mode."""
+
+    __tablename__ = "aggregate_outbox"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    order_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    order_created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False)
+    revenue_delta: Mapped[Decimal] = mapped_column(
+        Numeric(12, 2), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
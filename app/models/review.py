@@ -14,7 +14,9 @@ class Review(Base):
                          name="uq_reviews_user_course"),
         CheckConstraint("rating BETWEEN 1 AND 5",
                         name="ck_reviews_rating_valid"),
-        Index("ix_reviews_course_rating", "course_id", "rating"),
+        Index("ix_reviews_course_rating", "course_id",
+              "rating", "created_at", "id"),
+        Index("ix_reviews_course_created_at", "course_id", "created_at", "id"),
     )
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
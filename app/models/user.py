@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 
@@ -19,6 +19,13 @@ class Role(Base):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Case-insensitive prefix search (GET /users/search). Trigram indexes for
+        # substring search need pg_trgm and are created by sql/002.
+        Index("ix_users_email_prefix", text("lower(email) text_pattern_ops")),
+        Index("ix_users_full_name_prefix", text("lower(full_name) text_pattern_ops")),
+        Index("ix_users_role_id", "role_id", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     email: Mapped[str] = mapped_column(
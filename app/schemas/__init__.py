@@ -1,36 +1,90 @@
-from app.schemas.user import UserCreate, UserRead
-from app.schemas.course import CourseCreate, CourseUpdate, CourseRead
-from app.schemas.enrollment import EnrollmentCreate, EnrollmentRead
+from app.schemas.user import UserBulkCreate, UserBulkResult, UserCreate, UserRead
+from app.schemas.course import (
+    CourseCreate,
+    CourseDetail,
+    CourseModuleRead,
+    CourseRead,
+    CourseSearchResult,
+    CourseUpdate,
+    LessonSummary,
+)
+from app.schemas.enrollment import (
+    EnrollmentBulkCreate,
+    EnrollmentBulkCreated,
+    EnrollmentBulkResult,
+    EnrollmentCreate,
+    EnrollmentPair,
+    EnrollmentRead,
+)
 from app.schemas.order import (
+    OrderBulkCreate,
+    OrderBulkItemResult,
+    OrderBulkResult,
     OrderCreate,
+    OrderDetailRead,
+    OrderItemRead,
     OrderRead,
     OrderItemCreate,
     PaymentCreate,
     PaymentRead,
 )
-from app.schemas.review import ReviewCreate, ReviewRead
+from app.schemas.review import CourseReviewsPage, ReviewCreate, ReviewRead
 from app.schemas.report import TopCourseItem, UserActivityItem, SalesDynamicsItem
+from app.schemas.audit import AuditLogRead
 from app.schemas.import_job import ImportJobCreate, ImportJobRead, ImportJobErrorRead
+from app.schemas.metrics import (
+    CacheMetrics,
+    OutboxMetrics,
+    PartitionMetrics,
+    PasswordHashMetrics,
+    ProgressBufferMetrics,
+)
+from app.schemas.progress import ProgressEvent
+from app.schemas.page import Page
 
 __all__ = [
     "UserCreate",
     "UserRead",
+    "UserBulkCreate",
+    "UserBulkResult",
     "CourseCreate",
     "CourseUpdate",
     "CourseRead",
+    "CourseSearchResult",
+    "CourseDetail",
+    "CourseModuleRead",
+    "LessonSummary",
     "EnrollmentCreate",
     "EnrollmentRead",
+    "EnrollmentPair",
+    "EnrollmentBulkCreate",
+    "EnrollmentBulkCreated",
+    "EnrollmentBulkResult",
     "OrderCreate",
+    "OrderBulkCreate",
+    "OrderBulkItemResult",
+    "OrderBulkResult",
     "OrderRead",
+    "OrderDetailRead",
+    "OrderItemRead",
     "OrderItemCreate",
     "PaymentCreate",
     "PaymentRead",
     "ReviewCreate",
     "ReviewRead",
+    "CourseReviewsPage",
     "TopCourseItem",
     "UserActivityItem",
     "SalesDynamicsItem",
+    "AuditLogRead",
     "ImportJobCreate",
     "ImportJobRead",
     "ImportJobErrorRead",
+    "CacheMetrics",
+    "OutboxMetrics",
+    "ProgressBufferMetrics",
+    "PartitionMetrics",
+    "PasswordHashMetrics",
+    "ProgressEvent",
+    "Page",
 ]
@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class AuditLogRead(BaseModel):
+    id: int
+    table_name: str
+    record_id: str
+    action: str
+    # Full row images, or only the changed keys for tables audited in diff mode.
+    old_data: dict | None
+    new_data: dict | None
+    performed_by: int | None
+    source: str | None
+    performed_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -35,3 +35,32 @@ class CourseRead(CourseBase):
 
     class Config:
         from_attributes = True
+
+
+class CourseSearchResult(CourseRead):
+    rank: float
+
+
+class LessonSummary(BaseModel):
+    id: int
+    title: str
+    position: int
+    duration_minutes: int | None
+
+    class Config:
+        from_attributes = True
+
+
+class CourseModuleRead(BaseModel):
+    id: int
+    title: str
+    description: str | None
+    position: int
+    lessons: list[LessonSummary] = []
+
+    class Config:
+        from_attributes = True
+
+
+class CourseDetail(CourseRead):
+    modules: list[CourseModuleRead]
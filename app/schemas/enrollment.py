@@ -19,7 +19,28 @@ class EnrollmentRead(BaseModel):
     status: str
     started_at: datetime | None
     completed_at: datetime | None
+    lessons_total: int
+    lessons_completed: int
     created_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class EnrollmentPair(BaseModel):
+    user_id: int
+    course_id: int
+
+
+class EnrollmentBulkCreate(BaseModel):
+    enrollments: list[EnrollmentPair] = Field(min_length=1, max_length=10000)
+
+
+class EnrollmentBulkCreated(EnrollmentPair):
+    id: int
+
+
+class EnrollmentBulkResult(BaseModel):
+    created: list[EnrollmentBulkCreated]
+    # Already enrolled, repeated in the payload, or referencing an unknown user/course.
+    skipped: list[EnrollmentPair]
@@ -0,0 +1,53 @@
+from datetime import date, datetime
+
+from pydantic import BaseModel
+
+
+class OutboxMetrics(BaseModel):
+    mode: str
+    pending: int
+    lag_seconds: float
+    processed_total: int
+    last_drain_at: datetime | None
+
+
+class CacheMetrics(BaseModel):
+    name: str
+    size: int
+    hits: int
+    misses: int
+    coalesced: int
+
+
+class ProgressBufferMetrics(BaseModel):
+    pending: int
+    in_flight: int
+    capacity: int
+    accepted: int
+    coalesced: int
+    rejected: int
+    flushed: int
+    discarded: int
+    failed_flushes: int
+    consecutive_failures: int
+    last_flush_at: datetime | None
+    last_flush_seconds: float
+
+
+class PartitionMetrics(BaseModel):
+    table: str
+    horizon: date | None
+    months_ahead: int
+    warning: bool
+    last_check_at: datetime | None
+
+
+class PasswordHashMetrics(BaseModel):
+    workers: int
+    max_pending: int
+    in_flight: int
+    waiting: int
+    hashed_total: int
+    queue_seconds_avg: float
+    queue_seconds_max: float
+    hash_seconds_avg: float
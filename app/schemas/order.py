@@ -1,7 +1,7 @@
 from datetime import datetime
 from decimal import Decimal
 
-from pydantic import BaseModel, Field
+from pydantic import AliasPath, BaseModel, Field
 
 
 class OrderItemCreate(BaseModel):
@@ -44,3 +44,36 @@ class PaymentRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class OrderBulkCreate(BaseModel):
+    orders: list[OrderCreate] = Field(min_length=1, max_length=10000)
+
+
+class OrderBulkItemResult(BaseModel):
+    index: int
+    order_id: int | None = None
+    total_amount: Decimal | None = None
+    error: str | None = None
+
+
+class OrderBulkResult(BaseModel):
+    created: int
+    failed: int
+    results: list[OrderBulkItemResult]
+
+
+class OrderItemRead(BaseModel):
+    id: int
+    course_id: int
+    course_title: str = Field(validation_alias=AliasPath("course", "title"))
+    quantity: int
+    price: Decimal
+
+    class Config:
+        from_attributes = True
+
+
+class OrderDetailRead(OrderRead):
+    items: list[OrderItemRead]
+    payments: list[PaymentRead]
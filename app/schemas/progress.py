@@ -0,0 +1,8 @@
+from pydantic import BaseModel, Field
+
+
+class ProgressEvent(BaseModel):
+    enrollment_id: int
+    lesson_id: int
+    status: str = Field(pattern="^(not_started|in_progress|completed)$")
+    score: int | None = Field(default=None, ge=0)
@@ -1,7 +1,10 @@
 from datetime import datetime
+from decimal import Decimal
 
 from pydantic import BaseModel, Field
 
+from app.schemas.page import Page
+
 
 class ReviewCreate(BaseModel):
     user_id: int
@@ -20,3 +23,10 @@ class ReviewRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class CourseReviewsPage(Page[ReviewRead]):
+    avg_rating: Decimal
+    reviews_count: int
+    # Star rating (1..5) -> number of reviews, over all reviews of the course.
+    histogram: dict[int, int]
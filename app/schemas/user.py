@@ -20,3 +20,13 @@ class UserRead(UserBase):
 
     class Config:
         from_attributes = True
+
+
+class UserBulkCreate(BaseModel):
+    users: list[UserCreate] = Field(min_length=1, max_length=1000)
+
+
+class UserBulkResult(BaseModel):
+    created: list[UserRead]
+    # Emails that already exist or are repeated in the payload.
+    skipped: list[str]
@@ -0,0 +1,83 @@
+"""Обслуживание помесячных партиций orders / order_items / payments / audit_log.
+
+Запуск:
+    python scripts/manage_partitions.py create --months-ahead 6
+    python scripts/manage_partitions.py detach --older-than-months 24 [--drop]
+    python scripts/manage_partitions.py archive [--months-ahead 6] [--retention-months 12] [--dir archive/audit_log]
+
+create — заранее создаёт партиции на ближайшие месяцы (при старте API
+создаются текущий месяц и 3 следующих). detach — отсоединяет партиции
+orders / order_items / payments, закончившиеся раньше указанного горизонта;
+с --drop удаляет их. archive — создаёт будущие партиции и выгружает
+партиции audit_log старше срока хранения в <dir>/<партиция>.jsonl.gz
+(JSON Lines, gzip), после чего отсоединяет их (DETACH ... CONCURRENTLY)
+и удаляет. Устаревшие строки audit_log_default (если она осталась от
+старой схемы) выгружаются и удаляются, пустая партиция удаляется.
+"""
+
+import argparse
+import asyncio
+from datetime import date
+from pathlib import Path
+
+from app.core.config import settings
+from app.db.partitions import (
+    AUDIT_TABLE,
+    archive_partitions,
+    detach_partitions,
+    ensure_partitions,
+)
+from app.db.session import engine
+
+
+def months_ago(months: int) -> date:
+    today = date.today()
+    index = today.year * 12 + today.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create = commands.add_parser("create", help="create future partitions")
+    create.add_argument("--months-ahead", type=int, default=6)
+    create.add_argument("--months-back", type=int, default=0)
+
+    detach = commands.add_parser("detach", help="detach old partitions")
+    detach.add_argument("--older-than-months", type=int, required=True)
+    detach.add_argument("--drop", action="store_true")
+
+    archive = commands.add_parser(
+        "archive", help="create future partitions, archive and drop expired audit_log partitions")
+    archive.add_argument("--months-ahead", type=int, default=6)
+    archive.add_argument("--retention-months", type=int, default=settings.audit_retention_months)
+    archive.add_argument("--dir", type=Path, default=Path(settings.audit_archive_dir))
+
+    args = parser.parse_args()
+
+    if args.command == "archive":
+        async with engine.begin() as conn:
+            names = await ensure_partitions(conn, args.months_ahead)
+        paths = await archive_partitions(
+            engine, AUDIT_TABLE, months_ago(args.retention_months), args.dir,
+            settings.export_batch_size)
+        for name in [*names, *map(str, paths)]:
+            print(name)
+        print(f"create: {len(names)} partition(s), archive: {len(paths)} partition(s)")
+        return
+
+    async with engine.begin() as conn:
+        if args.command == "create":
+            names = await ensure_partitions(conn, args.months_ahead, args.months_back)
+        else:
+            names = await detach_partitions(
+                conn, months_ago(args.older_than_months), args.drop)
+
+    for name in names:
+        print(name)
+    print(f"{args.command}: {len(names)} partition(s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
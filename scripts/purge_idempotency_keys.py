@@ -0,0 +1,32 @@
+"""Удаляет устаревшие ключи идемпотентности из idempotency_keys.
+
+Запуск:
+    python scripts/purge_idempotency_keys.py [--ttl-hours 24] [--batch-size 1000]
+
+Ключи старше IDEMPOTENCY_TTL_HOURS API уже считает новыми, скрипт удаляет их
+порциями (по индексу created_at), каждая порция — отдельная транзакция.
+Запускать периодически, например раз в час.
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import settings
+from app.core.idempotency import purge_expired_keys
+from app.db.session import engine
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ttl-hours", type=int, default=settings.idempotency_ttl_hours)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    before = datetime.now(timezone.utc) - timedelta(hours=args.ttl_hours)
+    purged = await purge_expired_keys(engine, before, args.batch_size)
+    print(f"purge: {purged} key(s) created before {before.isoformat(timespec='seconds')}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -235,6 +235,7 @@ async def seed_orders_payments(session, students, courses):
             order_items.append(
                 models.OrderItem(
                     order_id=order.id,
+                    order_created_at=order.created_at,
                     course_id=course.id,
                     quantity=quantity,
                     price=price,
@@ -262,6 +263,7 @@ async def seed_orders_payments(session, students, courses):
         payments.append(
             models.Payment(
                 order_id=order.id,
+                order_created_at=order.created_at,
                 amount=total,
                 status=payment_status,
                 provider=random.choice(["stripe", "paypal", "yookassa", None]),
@@ -1,5 +1,7 @@
 -- Schema for EduMarket (baseline)
 
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 CREATE TABLE IF NOT EXISTS roles (
     id              SERIAL PRIMARY KEY,
     name            VARCHAR(50) UNIQUE NOT NULL,
@@ -16,6 +18,12 @@ CREATE TABLE IF NOT EXISTS users (
     updated_at      TIMESTAMPTZ NOT NULL DEFAULT now()
 );
 
+CREATE INDEX IF NOT EXISTS ix_users_email_prefix ON users (lower(email) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS ix_users_full_name_prefix ON users (lower(full_name) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS ix_users_role_id ON users (role_id, id);
+CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING GIN (lower(email) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_users_full_name_trgm ON users USING GIN (lower(full_name) gin_trgm_ops);
+
 CREATE TABLE IF NOT EXISTS courses (
     id                  BIGSERIAL PRIMARY KEY,
     title               VARCHAR(200) NOT NULL,
@@ -23,14 +31,36 @@ CREATE TABLE IF NOT EXISTS courses (
     price               NUMERIC(10,2) NOT NULL CHECK (price >= 0),
     status              VARCHAR(20) NOT NULL DEFAULT 'draft' CHECK (status IN ('draft','published','archived')),
     author_id           INTEGER REFERENCES users(id) ON DELETE SET NULL,
-    avg_rating          NUMERIC(3,2) NOT NULL DEFAULT 0,
+    rating_sum          BIGINT NOT NULL DEFAULT 0,
     reviews_count       INTEGER NOT NULL DEFAULT 0,
+    rating_counts       INTEGER[] NOT NULL DEFAULT '{0,0,0,0,0}',
+    avg_rating          NUMERIC(3,2) NOT NULL GENERATED ALWAYS AS (
+        CASE WHEN reviews_count > 0 THEN (rating_sum::NUMERIC / reviews_count)::NUMERIC(3,2) ELSE 0 END
+    ) STORED,
     enrollments_count   INTEGER NOT NULL DEFAULT 0,
     total_revenue       NUMERIC(12,2) NOT NULL DEFAULT 0,
+    curriculum_version  INTEGER NOT NULL DEFAULT 0,
+    lessons_count       INTEGER NOT NULL DEFAULT 0,
+    lessons_started_total   BIGINT NOT NULL DEFAULT 0,
+    lessons_completed_total BIGINT NOT NULL DEFAULT 0,
+    lessons_tracked_total   BIGINT NOT NULL DEFAULT 0,
     created_at          TIMESTAMPTZ NOT NULL DEFAULT now(),
-    updated_at          TIMESTAMPTZ NOT NULL DEFAULT now()
+    updated_at          TIMESTAMPTZ NOT NULL DEFAULT now(),
+    search_vector       TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+    ) STORED
 );
 
+CREATE INDEX IF NOT EXISTS ix_courses_updated_at ON courses (updated_at);
+CREATE INDEX IF NOT EXISTS ix_courses_search_vector ON courses USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS ix_courses_created_at_id ON courses (created_at, id);
+CREATE INDEX IF NOT EXISTS ix_courses_author_created_at ON courses (author_id, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_courses_published_price ON courses (price, id) WHERE status = 'published';
+CREATE INDEX IF NOT EXISTS ix_courses_published_avg_rating ON courses (avg_rating, id) WHERE status = 'published';
+CREATE INDEX IF NOT EXISTS ix_courses_published_enrollments ON courses (enrollments_count, id) WHERE status = 'published';
+CREATE INDEX IF NOT EXISTS ix_courses_published_revenue ON courses (total_revenue, id) WHERE status = 'published';
+
 CREATE TABLE IF NOT EXISTS course_modules (
     id          BIGSERIAL PRIMARY KEY,
     course_id   BIGINT NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
@@ -60,11 +90,17 @@ CREATE TABLE IF NOT EXISTS enrollments (
     status       VARCHAR(20) NOT NULL DEFAULT 'active' CHECK (status IN ('active','completed','cancelled')),
     started_at   TIMESTAMPTZ,
     completed_at TIMESTAMPTZ,
+    lessons_total     INTEGER NOT NULL DEFAULT 0,
+    lessons_started   INTEGER NOT NULL DEFAULT 0,
+    lessons_completed INTEGER NOT NULL DEFAULT 0,
+    lessons_tracked   INTEGER NOT NULL DEFAULT 0,
     created_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
     CONSTRAINT uq_enrollments_user_course UNIQUE (user_id, course_id)
 );
 
 CREATE INDEX IF NOT EXISTS ix_enrollments_user_course ON enrollments (user_id, course_id);
+CREATE INDEX IF NOT EXISTS ix_enrollments_created_at ON enrollments (created_at, id);
+CREATE INDEX IF NOT EXISTS ix_enrollments_course_created_at ON enrollments (course_id, created_at, id);
 
 CREATE TABLE IF NOT EXISTS progresses (
     id            BIGSERIAL PRIMARY KEY,
@@ -77,37 +113,52 @@ CREATE TABLE IF NOT EXISTS progresses (
     CONSTRAINT uq_progresses_enrollment_lesson UNIQUE (enrollment_id, lesson_id)
 );
 
+-- orders, order_items and payments are partitioned by month, partitions are
+-- created by fn_ensure_partitions (sql/002) and scripts/manage_partitions.py.
 CREATE TABLE IF NOT EXISTS orders (
-    id           BIGSERIAL PRIMARY KEY,
+    id           BIGSERIAL,
     user_id      INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     status       VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending','paid','cancelled','refunded')),
     total_amount NUMERIC(12,2) NOT NULL DEFAULT 0,
-    created_at   TIMESTAMPTZ NOT NULL DEFAULT now()
-);
+    created_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
 
-CREATE INDEX IF NOT EXISTS ix_orders_user_created ON orders (user_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_orders_user_created ON orders (user_id, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_orders_created_id ON orders (created_at, id);
 
 CREATE TABLE IF NOT EXISTS order_items (
-    id         BIGSERIAL PRIMARY KEY,
-    order_id   BIGINT NOT NULL REFERENCES orders(id) ON DELETE CASCADE,
-    course_id  BIGINT NOT NULL REFERENCES courses(id) ON DELETE RESTRICT,
-    quantity   INTEGER NOT NULL DEFAULT 1 CHECK (quantity > 0),
-    price      NUMERIC(10,2) NOT NULL DEFAULT 0 CHECK (price >= 0),
-    CONSTRAINT uq_order_items_order_course_unique UNIQUE (order_id, course_id)
-);
-
+    id               BIGSERIAL,
+    order_id         BIGINT NOT NULL,
+    order_created_at TIMESTAMPTZ NOT NULL,
+    course_id        BIGINT NOT NULL REFERENCES courses(id) ON DELETE RESTRICT,
+    quantity         INTEGER NOT NULL DEFAULT 1 CHECK (quantity > 0),
+    price            NUMERIC(10,2) NOT NULL DEFAULT 0 CHECK (price >= 0),
+    PRIMARY KEY (id, order_created_at),
+    CONSTRAINT uq_order_items_order_course_unique UNIQUE (order_id, order_created_at, course_id),
+    CONSTRAINT fk_order_items_order FOREIGN KEY (order_id, order_created_at)
+        REFERENCES orders(id, created_at) ON DELETE CASCADE
+) PARTITION BY RANGE (order_created_at);
+
+-- Partitioned by the order's created_at like order_items, so an orders month
+-- detaches together with all of its payments, paid or not.
 CREATE TABLE IF NOT EXISTS payments (
-    id             BIGSERIAL PRIMARY KEY,
-    order_id       BIGINT NOT NULL REFERENCES orders(id) ON DELETE CASCADE,
-    amount         NUMERIC(12,2) NOT NULL DEFAULT 0 CHECK (amount >= 0),
-    status         VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending','paid','failed','refunded')),
-    provider       VARCHAR(50),
-    transaction_id VARCHAR(100),
-    paid_at        TIMESTAMPTZ,
-    created_at     TIMESTAMPTZ NOT NULL DEFAULT now()
-);
+    id               BIGSERIAL,
+    order_id         BIGINT NOT NULL,
+    order_created_at TIMESTAMPTZ NOT NULL,
+    amount           NUMERIC(12,2) NOT NULL DEFAULT 0 CHECK (amount >= 0),
+    status           VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending','paid','failed','refunded')),
+    provider         VARCHAR(50),
+    transaction_id   VARCHAR(100),
+    paid_at          TIMESTAMPTZ,
+    created_at       TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (id, order_created_at),
+    CONSTRAINT fk_payments_order FOREIGN KEY (order_id, order_created_at)
+        REFERENCES orders(id, created_at) ON DELETE CASCADE
+) PARTITION BY RANGE (order_created_at);
 
 CREATE INDEX IF NOT EXISTS ix_payments_order_status ON payments (order_id, status);
+CREATE INDEX IF NOT EXISTS ix_payments_paid_at ON payments (paid_at);
 
 CREATE TABLE IF NOT EXISTS reviews (
     id         BIGSERIAL PRIMARY KEY,
@@ -119,10 +170,14 @@ CREATE TABLE IF NOT EXISTS reviews (
     CONSTRAINT uq_reviews_user_course UNIQUE (user_id, course_id)
 );
 
-CREATE INDEX IF NOT EXISTS ix_reviews_course_rating ON reviews (course_id, rating);
+CREATE INDEX IF NOT EXISTS ix_reviews_course_rating ON reviews (course_id, rating, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_reviews_course_created_at ON reviews (course_id, created_at, id);
 
+-- audit_log is partitioned by month of performed_at, expired months are exported
+-- and dropped by scripts/manage_partitions.py archive. It has no default
+-- partition, which would rule out DETACH PARTITION ... CONCURRENTLY.
 CREATE TABLE IF NOT EXISTS audit_log (
-    id           BIGSERIAL PRIMARY KEY,
+    id           BIGSERIAL,
     table_name   VARCHAR(100) NOT NULL,
     record_id    VARCHAR(100) NOT NULL,
     action       VARCHAR(10) NOT NULL,
@@ -130,11 +185,13 @@ CREATE TABLE IF NOT EXISTS audit_log (
     new_data     JSONB,
     performed_by INTEGER,
     source       VARCHAR(50),
-    performed_at TIMESTAMPTZ NOT NULL DEFAULT now()
-);
+    performed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (id, performed_at)
+) PARTITION BY RANGE (performed_at);
 
 CREATE INDEX IF NOT EXISTS ix_audit_log_table_action ON audit_log (table_name, action);
-CREATE INDEX IF NOT EXISTS ix_audit_log_performed_at ON audit_log (performed_at);
+CREATE INDEX IF NOT EXISTS ix_audit_log_performed_at_brin ON audit_log USING BRIN (performed_at) WITH (autosummarize = on);
+CREATE INDEX IF NOT EXISTS ix_audit_log_record ON audit_log (table_name, record_id, performed_at, id);
 
 CREATE TABLE IF NOT EXISTS import_jobs (
     id                BIGSERIAL PRIMARY KEY,
@@ -157,3 +214,23 @@ CREATE TABLE IF NOT EXISTS import_job_errors (
     payload      JSONB,
     created_at   TIMESTAMPTZ NOT NULL DEFAULT now()
 );
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    scope        VARCHAR(100) NOT NULL,
+    key          VARCHAR(255) NOT NULL,
+    request_hash VARCHAR(64) NOT NULL,
+    status_code  INTEGER NOT NULL,
+    response     JSONB NOT NULL,
+    created_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (scope, key)
+);
+
+CREATE INDEX IF NOT EXISTS ix_idempotency_keys_created_at ON idempotency_keys (created_at);
+
+CREATE TABLE IF NOT EXISTS aggregate_outbox (
+    id               BIGSERIAL PRIMARY KEY,
+    order_id         BIGINT NOT NULL,
+    order_created_at TIMESTAMPTZ NOT NULL,
+    revenue_delta    NUMERIC(12,2) NOT NULL,
+    created_at       TIMESTAMPTZ NOT NULL DEFAULT now()
+);
@@ -1,15 +1,280 @@
 -- Functions, triggers, and views for EduMarket
 
+-- =========================
+-- Optional extensions
+-- =========================
+
+-- Trigram indexes for substring search in GET /users/search. Without pg_trgm (not every
+-- PostgreSQL build ships contrib) the search still works, only without index support.
+DO $$
+BEGIN
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING GIN (lower(email) gin_trgm_ops);
+    CREATE INDEX IF NOT EXISTS ix_users_full_name_trgm ON users USING GIN (lower(full_name) gin_trgm_ops);
+EXCEPTION WHEN feature_not_supported OR undefined_file OR insufficient_privilege THEN
+    RAISE NOTICE 'pg_trgm is not available, substring user search runs without trigram indexes';
+END;
+$$;
+
+-- =========================
+-- Monthly range partitions (orders, order_items, payments, audit_log)
+-- =========================
+
+CREATE OR REPLACE FUNCTION fn_month_partition_name(p_table TEXT, p_month DATE) RETURNS TEXT AS $$
+    SELECT format('%s_y%sm%s', p_table, to_char(p_month, 'YYYY'), to_char(p_month, 'MM'));
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION fn_partition_key(p_table TEXT) RETURNS TEXT AS $$
+    SELECT pg_get_partkeydef(p_table::regclass);
+$$ LANGUAGE sql STABLE;
+
+-- Creates the partition for the month containing p_month (UTC bounds). Months whose rows
+-- already landed in the default partition are skipped with a warning instead of failing,
+-- so startup never breaks on them.
+CREATE OR REPLACE FUNCTION fn_create_month_partition(p_table TEXT, p_month DATE) RETURNS TEXT AS $$
+DECLARE
+    v_start TIMESTAMPTZ := date_trunc('month', p_month::TIMESTAMP) AT TIME ZONE 'UTC';
+    v_end TIMESTAMPTZ := (date_trunc('month', p_month::TIMESTAMP) + INTERVAL '1 month') AT TIME ZONE 'UTC';
+    v_name TEXT := fn_month_partition_name(p_table, date_trunc('month', p_month::TIMESTAMP)::DATE);
+    v_key TEXT := substring(fn_partition_key(p_table) FROM '\((.*)\)');
+    v_default TEXT := p_table || '_default';
+    v_conflict BOOLEAN := false;
+BEGIN
+    IF to_regclass(v_name) IS NOT NULL THEN
+        RETURN v_name;
+    END IF;
+    IF to_regclass(v_default) IS NOT NULL THEN
+        EXECUTE format('SELECT EXISTS (SELECT 1 FROM %I WHERE %I >= $1 AND %I < $2)', v_default, v_key, v_key)
+        INTO v_conflict USING v_start, v_end;
+    END IF;
+    IF v_conflict THEN
+        RAISE WARNING 'partition % not created: % already holds rows for this month', v_name, v_default;
+        RETURN NULL;
+    END IF;
+    EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)', v_name, p_table, v_start, v_end);
+    RETURN v_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- p_with_default => false leaves the table without a default partition, which
+-- DETACH PARTITION ... CONCURRENTLY requires (audit_log).
+DROP FUNCTION IF EXISTS fn_ensure_partitions(TEXT, INT, INT);
+CREATE OR REPLACE FUNCTION fn_ensure_partitions(
+    p_table TEXT,
+    p_months_ahead INT DEFAULT 3,
+    p_months_back INT DEFAULT 0,
+    p_with_default BOOLEAN DEFAULT true
+)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    v_offset INT;
+    v_name TEXT;
+BEGIN
+    IF p_with_default THEN
+        EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF %I DEFAULT', p_table || '_default', p_table);
+    END IF;
+    FOR v_offset IN -p_months_back..p_months_ahead LOOP
+        v_name := fn_create_month_partition(p_table, (date_trunc('month', now() AT TIME ZONE 'UTC') + make_interval(months => v_offset))::DATE);
+        IF v_name IS NOT NULL THEN
+            RETURN NEXT v_name;
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- End of the last monthly partition of p_table (first day with no month partition for
+-- it), NULL when there are none. Without a default partition rows from that day on fail.
+CREATE OR REPLACE FUNCTION fn_partition_horizon(p_table TEXT) RETURNS DATE AS $$
+    SELECT (max(to_date(right(child.relname, 8), '"y"YYYY"m"MM')) + INTERVAL '1 month')::DATE
+    FROM pg_inherits i
+    JOIN pg_class child ON child.oid = i.inhrelid
+    WHERE i.inhparent = p_table::regclass
+      AND child.relname ~ ('^' || p_table || '_y[0-9]{4}m[0-9]{2}$');
+$$ LANGUAGE sql STABLE;
+
+-- Monthly partitions that end on or before p_before, oldest first.
+CREATE OR REPLACE FUNCTION fn_expired_partitions(p_table TEXT, p_before DATE) RETURNS SETOF TEXT AS $$
+    SELECT child.relname::TEXT
+    FROM pg_inherits i
+    JOIN pg_class child ON child.oid = i.inhrelid
+    WHERE i.inhparent = p_table::regclass
+      AND child.relname ~ ('^' || p_table || '_y[0-9]{4}m[0-9]{2}$')
+      AND to_date(right(child.relname, 8), '"y"YYYY"m"MM') + INTERVAL '1 month' <= date_trunc('month', p_before::TIMESTAMP)
+    ORDER BY child.relname;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION fn_detach_partition(p_table TEXT, p_name TEXT, p_drop BOOLEAN DEFAULT false)
+RETURNS void AS $$
+BEGIN
+    EXECUTE format('ALTER TABLE %I DETACH PARTITION %I', p_table, p_name);
+    IF p_drop THEN
+        EXECUTE format('DROP TABLE %I', p_name);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Detaches (and optionally drops) monthly partitions that end on or before p_before.
+CREATE OR REPLACE FUNCTION fn_detach_partitions(p_table TEXT, p_before DATE, p_drop BOOLEAN DEFAULT false)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    v_name TEXT;
+BEGIN
+    FOR v_name IN SELECT fn_expired_partitions(p_table, p_before)
+    LOOP
+        PERFORM fn_detach_partition(p_table, v_name, p_drop);
+        RETURN NEXT v_name;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Archiving helpers (scripts/manage_partitions.py archive). Table names arrive as
+-- parameters and are quoted here with format(%I).
+
+-- Opens the cursor archive_rows over p_name, rows as JSON text ordered by id, and blocks
+-- writes to p_name until the transaction ends. With p_before only rows whose partition
+-- key (of p_table) is before that UTC date are included.
+CREATE OR REPLACE FUNCTION fn_open_archive_cursor(p_table TEXT, p_name TEXT, p_before DATE DEFAULT NULL)
+RETURNS refcursor AS $$
+DECLARE
+    v_rows refcursor := 'archive_rows';
+    v_key TEXT := substring(fn_partition_key(p_table) FROM '\((.*)\)');
+BEGIN
+    EXECUTE format('LOCK TABLE %I IN SHARE MODE', p_name);
+    OPEN v_rows NO SCROLL FOR EXECUTE format(
+        'SELECT to_jsonb(t)::TEXT FROM %I t WHERE $1 IS NULL OR t.%I < $1 ORDER BY t.id', p_name, v_key)
+    USING p_before::TIMESTAMP AT TIME ZONE 'UTC';
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Next p_count rows of archive_rows, none once it is exhausted.
+CREATE OR REPLACE FUNCTION fn_fetch_archive_rows(p_count INT) RETURNS SETOF TEXT AS $$
+DECLARE
+    v_rows refcursor := 'archive_rows';
+    v_row TEXT;
+BEGIN
+    FOR i IN 1..p_count LOOP
+        FETCH v_rows INTO v_row;
+        EXIT WHEN NOT FOUND;
+        RETURN NEXT v_row;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION fn_table_row_count(p_name TEXT) RETURNS BIGINT AS $$
+DECLARE
+    v_count BIGINT;
+BEGIN
+    EXECUTE format('SELECT count(*) FROM %I', p_name) INTO v_count;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Deletes rows of the default partition of p_table whose partition key is before the UTC
+-- date p_before, returns the number of rows left in it.
+CREATE OR REPLACE FUNCTION fn_purge_default_partition(p_table TEXT, p_before DATE) RETURNS BIGINT AS $$
+DECLARE
+    v_key TEXT := substring(fn_partition_key(p_table) FROM '\((.*)\)');
+BEGIN
+    EXECUTE format('DELETE FROM %I WHERE %I < $1', p_table || '_default', v_key)
+    USING p_before::TIMESTAMP AT TIME ZONE 'UTC';
+    RETURN fn_table_row_count(p_table || '_default');
+END;
+$$ LANGUAGE plpgsql;
+
+-- DETACH PARTITION ... CONCURRENTLY cannot run inside a function or a transaction block,
+-- so this only builds the statement for the caller to run in autocommit. A detach that
+-- was interrupted leaves the partition pending and is completed with FINALIZE. NULL when
+-- p_name is not a partition of p_table.
+CREATE OR REPLACE FUNCTION fn_detach_partition_concurrently_sql(p_table TEXT, p_name TEXT) RETURNS TEXT AS $$
+    SELECT format('ALTER TABLE %I DETACH PARTITION %I %s', p_table, p_name,
+                  CASE WHEN i.inhdetachpending THEN 'FINALIZE' ELSE 'CONCURRENTLY' END)
+    FROM pg_inherits i
+    WHERE i.inhparent = p_table::regclass AND i.inhrelid = to_regclass(p_name);
+$$ LANGUAGE sql STABLE;
+
+-- Standalone tables named like monthly partitions of p_table that end on or before
+-- p_before, oldest first: months detached by an archive run that stopped before the drop.
+CREATE OR REPLACE FUNCTION fn_detached_expired_partitions(p_table TEXT, p_before DATE) RETURNS SETOF TEXT AS $$
+    SELECT c.relname::TEXT
+    FROM pg_class c
+    WHERE c.relkind = 'r'
+      AND c.relnamespace = (SELECT relnamespace FROM pg_class WHERE oid = p_table::regclass)
+      AND c.relname ~ ('^' || p_table || '_y[0-9]{4}m[0-9]{2}$')
+      AND NOT EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhrelid = c.oid)
+      AND to_date(right(c.relname, 8), '"y"YYYY"m"MM') + INTERVAL '1 month' <= date_trunc('month', p_before::TIMESTAMP)
+    ORDER BY c.relname;
+$$ LANGUAGE sql STABLE;
+
+-- Drops a detached monthly partition of p_table. Refuses anything else.
+CREATE OR REPLACE FUNCTION fn_drop_detached_partition(p_table TEXT, p_name TEXT) RETURNS void AS $$
+BEGIN
+    IF p_name !~ ('^' || p_table || '_y[0-9]{4}m[0-9]{2}$')
+       OR EXISTS (SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(p_name)) THEN
+        RAISE EXCEPTION '% is not a detached monthly partition of %', p_name, p_table;
+    END IF;
+    EXECUTE format('DROP TABLE %I', p_name);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Row triggers on a partitioned table fire on the partition. Audit entries are filed
+-- under the partitioned table instead (see fn_log_audit).
+CREATE OR REPLACE FUNCTION fn_audit_table_name(p_relid OID) RETURNS TEXT AS $$
+    SELECT relname::TEXT FROM pg_class WHERE oid = COALESCE(pg_partition_root(p_relid), p_relid);
+$$ LANGUAGE sql STABLE;
+
+SELECT fn_ensure_partitions(t, p_with_default => d) FROM (VALUES
+    ('orders', true),
+    ('order_items', true),
+    ('payments', true),
+    ('audit_log', false)
+) AS tbl(t, d);
+
+-- Entries written before fn_audit_table_name was used carry partition names such as
+-- orders_y2026m10. One index probe per existing partition, a no-op once fixed.
+UPDATE audit_log a
+SET table_name = p.parent_name
+FROM (
+    SELECT child.relname::TEXT AS child_name, parent.relname::TEXT AS parent_name
+    FROM pg_inherits i
+    JOIN pg_class child ON child.oid = i.inhrelid
+    JOIN pg_class parent ON parent.oid = i.inhparent
+    WHERE parent.relkind = 'p' AND parent.relname <> 'audit_log'
+) p
+WHERE a.table_name = p.child_name;
+
 -- =========================
 -- Audit logging
 -- =========================
 
+-- Keys of p_from whose value differs in p_to, with their p_from values.
+CREATE OR REPLACE FUNCTION fn_jsonb_changed(p_from JSONB, p_to JSONB) RETURNS JSONB AS $$
+    SELECT COALESCE(jsonb_object_agg(f.key, f.value), '{}'::JSONB)
+    FROM jsonb_each(p_from) f
+    WHERE f.value IS DISTINCT FROM p_to -> f.key;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- True when p_skip_columns is set and every column the update changed is in it.
+CREATE OR REPLACE FUNCTION fn_audit_skip_update(p_old JSONB, p_new JSONB, p_skip_columns TEXT[]) RETURNS BOOLEAN AS $$
+    SELECT p_skip_columns IS NOT NULL
+       AND NOT EXISTS (
+           SELECT 1 FROM jsonb_object_keys(fn_jsonb_changed(p_new, p_old)) k
+           WHERE k <> ALL (p_skip_columns)
+       );
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Trigger arguments (set by attach_audit_trigger): TG_ARGV[0] is the UPDATE payload,
+-- 'full' stores both row images, 'diff' only the changed keys with their old and new
+-- values. TG_ARGV[1] is an optional TEXT[] literal of columns whose sole change does not
+-- get logged (aggregate counters maintained by triggers).
 CREATE OR REPLACE FUNCTION fn_log_audit() RETURNS trigger AS $$
 DECLARE
     v_old JSONB;
     v_new JSONB;
     v_user_id INT;
     v_source TEXT;
+    v_diff BOOLEAN := TG_NARGS > 0 AND TG_ARGV[0] = 'diff';
+    v_skip_columns TEXT[] := CASE WHEN TG_NARGS > 1 THEN NULLIF(TG_ARGV[1], '')::TEXT[] END;
 BEGIN
     v_user_id := NULLIF(current_setting('app.current_user', true), '')::INT;
     v_source := current_setting('app.source', true);
@@ -23,52 +288,199 @@ BEGIN
     ELSE
         v_old := to_jsonb(OLD);
         v_new := to_jsonb(NEW);
+        IF fn_audit_skip_update(v_old, v_new, v_skip_columns) THEN
+            RETURN NEW;
+        END IF;
+        IF v_diff THEN
+            SELECT fn_jsonb_changed(v_old, v_new), fn_jsonb_changed(v_new, v_old) INTO v_old, v_new;
+        END IF;
     END IF;
 
     INSERT INTO audit_log(table_name, record_id, action, old_data, new_data, performed_by, source, performed_at)
-    VALUES (TG_TABLE_NAME, COALESCE(NEW.id, OLD.id)::TEXT, TG_OP, v_old, v_new, v_user_id, v_source, now());
+    VALUES (fn_audit_table_name(TG_RELID), COALESCE(NEW.id, OLD.id)::TEXT, TG_OP, v_old, v_new, v_user_id, v_source, now());
 
     RETURN COALESCE(NEW, OLD);
 END;
 $$ LANGUAGE plpgsql;
 
-CREATE OR REPLACE FUNCTION attach_audit_trigger(table_name TEXT) RETURNS void AS $$
+-- Statement-level variant: one set-based INSERT into audit_log per statement instead of a
+-- PL/pgSQL call and a single-row INSERT per changed row. UPDATE rows are paired by id.
+-- Takes the same trigger arguments as fn_log_audit.
+CREATE OR REPLACE FUNCTION fn_log_audit_statement() RETURNS trigger AS $$
+DECLARE
+    v_user_id INT;
+    v_source TEXT;
+    v_diff BOOLEAN := TG_NARGS > 0 AND TG_ARGV[0] = 'diff';
+    v_skip_columns TEXT[] := CASE WHEN TG_NARGS > 1 THEN NULLIF(TG_ARGV[1], '')::TEXT[] END;
+BEGIN
+    v_user_id := NULLIF(current_setting('app.current_user', true), '')::INT;
+    v_source := current_setting('app.source', true);
+
+    IF (TG_OP = 'INSERT') THEN
+        INSERT INTO audit_log(table_name, record_id, action, old_data, new_data, performed_by, source, performed_at)
+        SELECT TG_TABLE_NAME, n.id::TEXT, TG_OP, NULL, to_jsonb(n), v_user_id, v_source, now()
+        FROM new_rows n;
+    ELSIF (TG_OP = 'DELETE') THEN
+        INSERT INTO audit_log(table_name, record_id, action, old_data, new_data, performed_by, source, performed_at)
+        SELECT TG_TABLE_NAME, o.id::TEXT, TG_OP, to_jsonb(o), NULL, v_user_id, v_source, now()
+        FROM old_rows o;
+    ELSE
+        INSERT INTO audit_log(table_name, record_id, action, old_data, new_data, performed_by, source, performed_at)
+        SELECT TG_TABLE_NAME, r.record_id, TG_OP,
+               CASE WHEN v_diff AND r.new_data IS NOT NULL THEN fn_jsonb_changed(r.old_data, r.new_data) ELSE r.old_data END,
+               CASE WHEN v_diff AND r.old_data IS NOT NULL THEN fn_jsonb_changed(r.new_data, r.old_data) ELSE r.new_data END,
+               v_user_id, v_source, now()
+        FROM (
+            SELECT COALESCE(n.id, o.id)::TEXT AS record_id,
+                   CASE WHEN o.id IS NULL THEN NULL ELSE to_jsonb(o) END AS old_data,
+                   CASE WHEN n.id IS NULL THEN NULL ELSE to_jsonb(n) END AS new_data
+            FROM new_rows n
+            FULL JOIN old_rows o ON o.id = n.id
+        ) r
+        WHERE r.old_data IS NULL OR r.new_data IS NULL
+           OR NOT fn_audit_skip_update(r.old_data, r.new_data, v_skip_columns);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- p_mode 'row' attaches fn_log_audit FOR EACH ROW, 'statement' attaches fn_log_audit_statement
+-- with transition tables (one trigger per event, as PostgreSQL requires). p_payload and
+-- p_skip_columns are passed to the trigger function as arguments (see fn_log_audit).
+-- Re-running with other settings switches the table over.
+DROP FUNCTION IF EXISTS attach_audit_trigger(TEXT, TEXT);
+CREATE OR REPLACE FUNCTION attach_audit_trigger(
+    table_name TEXT,
+    p_mode TEXT DEFAULT 'row',
+    p_payload TEXT DEFAULT 'full',
+    p_skip_columns TEXT[] DEFAULT NULL
+) RETURNS void AS $$
+DECLARE
+    v_args TEXT;
 BEGIN
+    IF p_mode NOT IN ('row', 'statement') THEN
+        RAISE EXCEPTION 'Unknown audit trigger mode: %', p_mode;
+    END IF;
+    IF p_payload NOT IN ('full', 'diff') THEN
+        RAISE EXCEPTION 'Unknown audit payload: %', p_payload;
+    END IF;
+    v_args := format('%L, %L', p_payload, COALESCE(p_skip_columns::TEXT, ''));
+
     EXECUTE format('DROP TRIGGER IF EXISTS trg_audit_%I ON %I', table_name, table_name);
-    EXECUTE format('CREATE TRIGGER trg_audit_%I AFTER INSERT OR UPDATE OR DELETE ON %I FOR EACH ROW EXECUTE FUNCTION fn_log_audit();', table_name, table_name);
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_audit_ins_%I ON %I', table_name, table_name);
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_audit_upd_%I ON %I', table_name, table_name);
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_audit_del_%I ON %I', table_name, table_name);
+
+    IF p_mode = 'row' THEN
+        EXECUTE format('CREATE TRIGGER trg_audit_%I AFTER INSERT OR UPDATE OR DELETE ON %I FOR EACH ROW EXECUTE FUNCTION fn_log_audit(%s)', table_name, table_name, v_args);
+    ELSE
+        EXECUTE format('CREATE TRIGGER trg_audit_ins_%I AFTER INSERT ON %I REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION fn_log_audit_statement(%s)', table_name, table_name, v_args);
+        EXECUTE format('CREATE TRIGGER trg_audit_upd_%I AFTER UPDATE ON %I REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION fn_log_audit_statement(%s)', table_name, table_name, v_args);
+        EXECUTE format('CREATE TRIGGER trg_audit_del_%I AFTER DELETE ON %I REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION fn_log_audit_statement(%s)', table_name, table_name, v_args);
+    END IF;
 END;
 $$ LANGUAGE plpgsql;
 
-SELECT attach_audit_trigger(t) FROM (VALUES
-    ('users'),
-    ('courses'),
-    ('course_modules'),
-    ('lessons'),
-    ('enrollments'),
-    ('progresses'),
-    ('orders'),
-    ('order_items'),
-    ('payments'),
-    ('reviews')
-) AS tbl(t);
+-- Tables written in bulk (order items, enrollments, progress buffer flushes) use
+-- statement-level auditing. Tables with large text columns or frequent counter updates
+-- store UPDATE diffs, and updates that only move trigger-maintained aggregates
+-- (course ratings, revenue, enrollment and progress counters) are not logged.
+SELECT attach_audit_trigger(t, m, p, s) FROM (VALUES
+    ('users', 'row', 'full', NULL),
+    ('courses', 'row', 'diff', ARRAY[
+        'rating_sum', 'reviews_count', 'rating_counts', 'avg_rating', 'enrollments_count',
+        'total_revenue', 'curriculum_version', 'lessons_count', 'lessons_started_total',
+        'lessons_completed_total', 'lessons_tracked_total', 'updated_at']),
+    ('course_modules', 'row', 'diff', NULL),
+    ('lessons', 'row', 'diff', NULL),
+    ('enrollments', 'statement', 'diff', ARRAY['lessons_total', 'lessons_started', 'lessons_completed', 'lessons_tracked']),
+    ('progresses', 'statement', 'diff', NULL),
+    ('orders', 'row', 'full', NULL),
+    ('order_items', 'statement', 'full', NULL),
+    ('payments', 'row', 'full', NULL),
+    ('reviews', 'row', 'full', NULL)
+) AS tbl(t, m, p, s);
+
+-- Full versions of one record, newest first, rebuilt from its audit entries and the
+-- current row. Walks back from the live row (or the DELETE image), so diff-only UPDATE
+-- entries become complete rows. Columns whose changes were skipped show their later
+-- values, and entries archived out of audit_log are not included.
+CREATE OR REPLACE FUNCTION fn_audit_row_versions(p_table TEXT, p_record_id TEXT)
+RETURNS TABLE(audit_id BIGINT, action VARCHAR, performed_by INT, performed_at TIMESTAMPTZ, row_data JSONB) AS $$
+DECLARE
+    v_state JSONB;
+    v_entry RECORD;
+BEGIN
+    -- record_id is the id column as text. Compare on the typed key so the primary key index is used.
+    EXECUTE format('SELECT to_jsonb(t) FROM %I t WHERE t.id = $1::BIGINT', p_table)
+    INTO v_state USING p_record_id;
+
+    FOR v_entry IN
+        SELECT a.id, a.action, a.old_data, a.new_data, a.performed_by, a.performed_at
+        FROM audit_log a
+        WHERE a.table_name = p_table AND a.record_id = p_record_id
+        ORDER BY a.performed_at DESC, a.id DESC
+    LOOP
+        audit_id := v_entry.id;
+        action := v_entry.action;
+        performed_by := v_entry.performed_by;
+        performed_at := v_entry.performed_at;
+        IF v_entry.action = 'DELETE' THEN
+            row_data := NULL;
+            v_state := v_entry.old_data;
+        ELSIF v_entry.action = 'INSERT' THEN
+            row_data := COALESCE(v_state, v_entry.new_data);
+            v_state := NULL;
+        ELSE
+            row_data := COALESCE(v_state, '{}'::JSONB) || v_entry.new_data;
+            v_state := row_data || v_entry.old_data;
+        END IF;
+        RETURN NEXT;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql STABLE;
 
 -- =========================
 -- Aggregate maintenance triggers
 -- =========================
 
-CREATE OR REPLACE FUNCTION fn_update_course_rating() RETURNS trigger AS $$
+-- Removes p_old_rating and adds p_new_rating (either may be NULL) to the running rating
+-- state of a course: sum, count and the 1..5 star histogram in rating_counts.
+DROP FUNCTION IF EXISTS fn_apply_rating_delta(BIGINT, INT, INT);
+CREATE OR REPLACE FUNCTION fn_apply_rating_delta(p_course_id BIGINT, p_old_rating INT, p_new_rating INT)
+RETURNS void AS $$
 BEGIN
-    UPDATE courses c
-    SET avg_rating = COALESCE(sub.avg_rating, 0),
-        reviews_count = COALESCE(sub.cnt, 0),
+    UPDATE courses
+    SET rating_sum = rating_sum + COALESCE(p_new_rating, 0) - COALESCE(p_old_rating, 0),
+        reviews_count = reviews_count
+            + (p_new_rating IS NOT NULL)::INT - (p_old_rating IS NOT NULL)::INT,
+        rating_counts = ARRAY(
+            SELECT rating_counts[i]
+                   + CASE WHEN i = p_new_rating THEN 1 ELSE 0 END
+                   - CASE WHEN i = p_old_rating THEN 1 ELSE 0 END
+            FROM generate_series(1, 5) AS i
+            ORDER BY i
+        ),
         updated_at = now()
-    FROM (
-        SELECT course_id, AVG(rating)::NUMERIC(3,2) AS avg_rating, COUNT(*) AS cnt
-        FROM reviews
-        WHERE course_id = COALESCE(NEW.course_id, OLD.course_id)
-        GROUP BY course_id
-    ) sub
-    WHERE c.id = sub.course_id;
+    WHERE id = p_course_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Keeps courses.rating_sum, reviews_count and rating_counts as running totals from the
+-- OLD/NEW delta of the changed review, avg_rating is a generated column over them. Drift
+-- can be checked and repaired with fn_rebuild_course_rating().
+CREATE OR REPLACE FUNCTION fn_update_course_rating() RETURNS trigger AS $$
+BEGIN
+    IF (TG_OP = 'INSERT') THEN
+        PERFORM fn_apply_rating_delta(NEW.course_id, NULL, NEW.rating);
+    ELSIF (TG_OP = 'DELETE') THEN
+        PERFORM fn_apply_rating_delta(OLD.course_id, OLD.rating, NULL);
+    ELSIF (NEW.course_id <> OLD.course_id) THEN
+        PERFORM fn_apply_rating_delta(OLD.course_id, OLD.rating, NULL);
+        PERFORM fn_apply_rating_delta(NEW.course_id, NULL, NEW.rating);
+    ELSIF (NEW.rating <> OLD.rating) THEN
+        PERFORM fn_apply_rating_delta(NEW.course_id, OLD.rating, NEW.rating);
+    END IF;
     RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
@@ -80,56 +492,347 @@ FOR EACH ROW
 EXECUTE FUNCTION fn_update_course_rating();
 
 
+-- Statement-level: counts active/completed rows entering (new_rows) and leaving (old_rows)
+-- per course and applies one UPDATE per affected course, so a bulk insert of N
+-- enrollments touches each course once instead of N times. The per-enrollment progress
+-- counters are rolled up into courses.lessons_started_total/lessons_completed_total/
+-- lessons_tracked_total the same way (all statuses, a deleted enrollment takes its progress with it).
+-- updated_at only moves with enrollments_count, which CourseRead exposes. Progress-only
+-- deltas (every progress buffer flush rolls up here) must not invalidate the catalog cache.
 CREATE OR REPLACE FUNCTION fn_update_course_enrollments() RETURNS trigger AS $$
 BEGIN
-    UPDATE courses c
-    SET enrollments_count = COALESCE(sub.cnt, 0),
-        updated_at = now()
-    FROM (
-        SELECT course_id, COUNT(*) AS cnt
-        FROM enrollments
-        WHERE course_id = COALESCE(NEW.course_id, OLD.course_id)
-          AND status IN ('active','completed')
-        GROUP BY course_id
-    ) sub
-    WHERE c.id = sub.course_id;
+    IF (TG_OP = 'INSERT') THEN
+        UPDATE courses c
+        SET enrollments_count = c.enrollments_count + d.delta,
+            lessons_started_total = c.lessons_started_total + d.started,
+            lessons_completed_total = c.lessons_completed_total + d.completed,
+            lessons_tracked_total = c.lessons_tracked_total + d.tracked,
+            updated_at = CASE WHEN d.delta <> 0 THEN now() ELSE c.updated_at END
+        FROM (
+            SELECT course_id,
+                   COUNT(*) FILTER (WHERE status IN ('active','completed')) AS delta,
+                   SUM(lessons_started) AS started,
+                   SUM(lessons_completed) AS completed,
+                   SUM(lessons_tracked) AS tracked
+            FROM new_rows
+            GROUP BY course_id
+        ) d
+        WHERE c.id = d.course_id AND (d.delta, d.started, d.completed, d.tracked) <> (0, 0, 0, 0);
+    ELSIF (TG_OP = 'DELETE') THEN
+        UPDATE courses c
+        SET enrollments_count = c.enrollments_count - d.delta,
+            lessons_started_total = c.lessons_started_total - d.started,
+            lessons_completed_total = c.lessons_completed_total - d.completed,
+            lessons_tracked_total = c.lessons_tracked_total - d.tracked,
+            updated_at = CASE WHEN d.delta <> 0 THEN now() ELSE c.updated_at END
+        FROM (
+            SELECT course_id,
+                   COUNT(*) FILTER (WHERE status IN ('active','completed')) AS delta,
+                   SUM(lessons_started) AS started,
+                   SUM(lessons_completed) AS completed,
+                   SUM(lessons_tracked) AS tracked
+            FROM old_rows
+            GROUP BY course_id
+        ) d
+        WHERE c.id = d.course_id AND (d.delta, d.started, d.completed, d.tracked) <> (0, 0, 0, 0);
+    ELSE
+        UPDATE courses c
+        SET enrollments_count = c.enrollments_count + d.delta,
+            lessons_started_total = c.lessons_started_total + d.started,
+            lessons_completed_total = c.lessons_completed_total + d.completed,
+            lessons_tracked_total = c.lessons_tracked_total + d.tracked,
+            updated_at = CASE WHEN d.delta <> 0 THEN now() ELSE c.updated_at END
+        FROM (
+            SELECT course_id, SUM(delta) AS delta, SUM(started) AS started, SUM(completed) AS completed,
+                   SUM(tracked) AS tracked
+            FROM (
+                SELECT course_id, CASE WHEN status IN ('active','completed') THEN 1 ELSE 0 END AS delta,
+                       lessons_started AS started, lessons_completed AS completed, lessons_tracked AS tracked
+                FROM new_rows
+                UNION ALL
+                SELECT course_id, CASE WHEN status IN ('active','completed') THEN -1 ELSE 0 END,
+                       -lessons_started, -lessons_completed, -lessons_tracked
+                FROM old_rows
+            ) changes
+            GROUP BY course_id
+            HAVING (SUM(delta), SUM(started), SUM(completed), SUM(tracked)) <> (0, 0, 0, 0)
+        ) d
+        WHERE c.id = d.course_id;
+    END IF;
     RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
-DROP TRIGGER IF EXISTS trg_enrollments_agg ON enrollments;
-CREATE TRIGGER trg_enrollments_agg
-AFTER INSERT OR UPDATE OR DELETE ON enrollments
+-- New enrollments start with the current number of lessons of their course.
+CREATE OR REPLACE FUNCTION fn_set_enrollment_lessons_total() RETURNS trigger AS $$
+BEGIN
+    SELECT lessons_count INTO NEW.lessons_total FROM courses WHERE id = NEW.course_id;
+    NEW.lessons_total := COALESCE(NEW.lessons_total, 0);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_enrollments_lessons_total ON enrollments;
+CREATE TRIGGER trg_enrollments_lessons_total
+BEFORE INSERT ON enrollments
 FOR EACH ROW
+EXECUTE FUNCTION fn_set_enrollment_lessons_total();
+
+DROP TRIGGER IF EXISTS trg_enrollments_agg ON enrollments;
+DROP TRIGGER IF EXISTS trg_enrollments_agg_ins ON enrollments;
+CREATE TRIGGER trg_enrollments_agg_ins
+AFTER INSERT ON enrollments
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
 EXECUTE FUNCTION fn_update_course_enrollments();
 
+DROP TRIGGER IF EXISTS trg_enrollments_agg_upd ON enrollments;
+CREATE TRIGGER trg_enrollments_agg_upd
+AFTER UPDATE ON enrollments
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION fn_update_course_enrollments();
 
-CREATE OR REPLACE FUNCTION fn_update_course_revenue() RETURNS trigger AS $$
+DROP TRIGGER IF EXISTS trg_enrollments_agg_del ON enrollments;
+CREATE TRIGGER trg_enrollments_agg_del
+AFTER DELETE ON enrollments
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION fn_update_course_enrollments();
+
+-- Statement-level: folds the started/completed status changes of progress rows, and the
+-- number of rows, into enrollments.lessons_started/lessons_completed/lessons_tracked, one UPDATE per affected enrollment (a
+-- flush of the progress buffer is a single upsert). The enrollments trigger then rolls
+-- the same deltas up into courses.
+CREATE OR REPLACE FUNCTION fn_update_enrollment_progress() RETURNS trigger AS $$
 BEGIN
+    IF (TG_OP = 'INSERT') THEN
+        UPDATE enrollments e
+        SET lessons_started = e.lessons_started + d.started,
+            lessons_completed = e.lessons_completed + d.completed,
+            lessons_tracked = e.lessons_tracked + d.tracked
+        FROM (
+            SELECT enrollment_id,
+                   COUNT(*) FILTER (WHERE status IN ('in_progress','completed')) AS started,
+                   COUNT(*) FILTER (WHERE status = 'completed') AS completed,
+                   COUNT(*) AS tracked
+            FROM new_rows
+            GROUP BY enrollment_id
+        ) d
+        WHERE e.id = d.enrollment_id AND (d.started, d.completed, d.tracked) <> (0, 0, 0);
+    ELSIF (TG_OP = 'DELETE') THEN
+        UPDATE enrollments e
+        SET lessons_started = e.lessons_started - d.started,
+            lessons_completed = e.lessons_completed - d.completed,
+            lessons_tracked = e.lessons_tracked - d.tracked
+        FROM (
+            SELECT enrollment_id,
+                   COUNT(*) FILTER (WHERE status IN ('in_progress','completed')) AS started,
+                   COUNT(*) FILTER (WHERE status = 'completed') AS completed,
+                   COUNT(*) AS tracked
+            FROM old_rows
+            GROUP BY enrollment_id
+        ) d
+        WHERE e.id = d.enrollment_id AND (d.started, d.completed, d.tracked) <> (0, 0, 0);
+    ELSE
+        UPDATE enrollments e
+        SET lessons_started = e.lessons_started + d.started,
+            lessons_completed = e.lessons_completed + d.completed,
+            lessons_tracked = e.lessons_tracked + d.tracked
+        FROM (
+            SELECT enrollment_id, SUM(started) AS started, SUM(completed) AS completed,
+                   SUM(tracked) AS tracked
+            FROM (
+                SELECT enrollment_id,
+                       CASE WHEN status IN ('in_progress','completed') THEN 1 ELSE 0 END AS started,
+                       CASE WHEN status = 'completed' THEN 1 ELSE 0 END AS completed,
+                       1 AS tracked
+                FROM new_rows
+                UNION ALL
+                SELECT enrollment_id,
+                       CASE WHEN status IN ('in_progress','completed') THEN -1 ELSE 0 END,
+                       CASE WHEN status = 'completed' THEN -1 ELSE 0 END,
+                       -1
+                FROM old_rows
+            ) changes
+            GROUP BY enrollment_id
+            HAVING (SUM(started), SUM(completed), SUM(tracked)) <> (0, 0, 0)
+        ) d
+        WHERE e.id = d.enrollment_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_progresses_agg_ins ON progresses;
+CREATE TRIGGER trg_progresses_agg_ins
+AFTER INSERT ON progresses
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION fn_update_enrollment_progress();
+
+DROP TRIGGER IF EXISTS trg_progresses_agg_upd ON progresses;
+CREATE TRIGGER trg_progresses_agg_upd
+AFTER UPDATE ON progresses
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION fn_update_enrollment_progress();
+
+DROP TRIGGER IF EXISTS trg_progresses_agg_del ON progresses;
+CREATE TRIGGER trg_progresses_agg_del
+AFTER DELETE ON progresses
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION fn_update_enrollment_progress();
+
+
+CREATE OR REPLACE FUNCTION fn_payment_revenue_delta(p_status TEXT, p_amount NUMERIC) RETURNS NUMERIC AS $$
+    SELECT CASE p_status
+        WHEN 'paid' THEN p_amount
+        WHEN 'refunded' THEN -p_amount
+        ELSE 0
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Adds a revenue delta to every course of the order. Sessions started with
+-- app.aggregate_mode = 'outbox' only queue the delta in aggregate_outbox, it is applied
+-- later by fn_drain_aggregate_outbox().
+CREATE OR REPLACE FUNCTION fn_apply_revenue_delta(p_order_id BIGINT, p_order_created_at TIMESTAMPTZ, p_delta NUMERIC)
+RETURNS void AS $$
+BEGIN
+    IF p_delta = 0 THEN
+        RETURN;
+    END IF;
+    IF current_setting('app.aggregate_mode', true) = 'outbox' THEN
+        INSERT INTO aggregate_outbox(order_id, order_created_at, revenue_delta)
+        VALUES (p_order_id, p_order_created_at, p_delta);
+        RETURN;
+    END IF;
     UPDATE courses c
-    SET total_revenue = COALESCE(sub.total, 0),
+    SET total_revenue = c.total_revenue + p_delta,
         updated_at = now()
-    FROM (
-        SELECT oi.course_id,
-               SUM(CASE WHEN p.status = 'refunded' THEN -p.amount ELSE p.amount END) AS total
-        FROM payments p
-        JOIN orders o ON o.id = p.order_id
-        JOIN order_items oi ON oi.order_id = o.id
-        WHERE p.order_id = COALESCE(NEW.order_id, OLD.order_id)
-          AND p.status IN ('paid','refunded')
-        GROUP BY oi.course_id
-    ) sub
-    WHERE c.id = sub.course_id;
+    WHERE c.id IN (
+        SELECT oi.course_id FROM order_items oi
+        WHERE oi.order_id = p_order_id AND oi.order_created_at = p_order_created_at
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Applies only the signed change of the affected payment row to the courses of its order
+-- instead of re-summing the whole order history. Drift can be checked and repaired with
+-- fn_rebuild_course_revenue().
+CREATE OR REPLACE FUNCTION fn_update_course_revenue() RETURNS trigger AS $$
+DECLARE
+    v_old NUMERIC := 0;
+    v_new NUMERIC := 0;
+BEGIN
+    IF (TG_OP IN ('UPDATE','DELETE')) THEN
+        v_old := fn_payment_revenue_delta(OLD.status, OLD.amount);
+    END IF;
+    IF (TG_OP IN ('INSERT','UPDATE')) THEN
+        v_new := fn_payment_revenue_delta(NEW.status, NEW.amount);
+    END IF;
+
+    IF (TG_OP = 'UPDATE' AND (NEW.order_id, NEW.order_created_at) IS DISTINCT FROM (OLD.order_id, OLD.order_created_at)) THEN
+        PERFORM fn_apply_revenue_delta(OLD.order_id, OLD.order_created_at, -v_old);
+        v_old := 0;
+    END IF;
+
+    PERFORM fn_apply_revenue_delta(
+        COALESCE(NEW.order_id, OLD.order_id),
+        COALESCE(NEW.order_created_at, OLD.order_created_at),
+        v_new - v_old
+    );
     RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
+-- Drains up to p_limit queued events, coalesces them per course and applies one UPDATE
+-- per course. Returns the number of events consumed, or NULL when another session is
+-- draining right now.
+CREATE OR REPLACE FUNCTION fn_drain_aggregate_outbox(p_limit INT DEFAULT 1000) RETURNS INT AS $$
+DECLARE
+    v_events INT;
+BEGIN
+    IF NOT pg_try_advisory_xact_lock(hashtext('aggregate_outbox')) THEN
+        RETURN NULL;
+    END IF;
+
+    WITH batch AS (
+        DELETE FROM aggregate_outbox
+        WHERE id IN (SELECT id FROM aggregate_outbox ORDER BY id LIMIT p_limit)
+        RETURNING order_id, order_created_at, revenue_delta
+    ), per_course AS (
+        SELECT oi.course_id, SUM(b.revenue_delta) AS delta
+        FROM batch b
+        JOIN order_items oi ON oi.order_id = b.order_id AND oi.order_created_at = b.order_created_at
+        GROUP BY oi.course_id
+    ), applied AS (
+        UPDATE courses c
+        SET total_revenue = c.total_revenue + pc.delta,
+            updated_at = now()
+        FROM per_course pc
+        WHERE c.id = pc.course_id AND pc.delta <> 0
+    )
+    SELECT COUNT(*) INTO v_events FROM batch;
+    RETURN v_events;
+END;
+$$ LANGUAGE plpgsql;
+
 DROP TRIGGER IF EXISTS trg_payments_revenue ON payments;
 CREATE TRIGGER trg_payments_revenue
 AFTER INSERT OR UPDATE OR DELETE ON payments
 FOR EACH ROW
 EXECUTE FUNCTION fn_update_course_revenue();
 
+-- Bumps courses.curriculum_version once per statement on module/lesson changes, so
+-- cached curriculum trees (keyed by version) go stale without per-row work. Lesson
+-- changes also recount courses.lessons_count and copy it to enrollments.lessons_total.
+CREATE OR REPLACE FUNCTION fn_bump_curriculum_version() RETURNS trigger AS $$
+DECLARE
+    v_courses BIGINT[];
+BEGIN
+    IF (TG_OP = 'INSERT') THEN
+        SELECT array_agg(DISTINCT course_id) INTO v_courses FROM new_rows;
+    ELSIF (TG_OP = 'DELETE') THEN
+        SELECT array_agg(DISTINCT course_id) INTO v_courses FROM old_rows;
+    ELSE
+        SELECT array_agg(course_id) INTO v_courses
+        FROM (SELECT course_id FROM new_rows UNION SELECT course_id FROM old_rows) changed;
+    END IF;
+
+    UPDATE courses SET curriculum_version = curriculum_version + 1
+    WHERE id = ANY(v_courses);
+
+    IF (TG_TABLE_NAME = 'lessons') THEN
+        UPDATE courses c
+        SET lessons_count = (SELECT COUNT(*) FROM lessons l WHERE l.course_id = c.id)
+        WHERE c.id = ANY(v_courses);
+        UPDATE enrollments e
+        SET lessons_total = c.lessons_count
+        FROM courses c
+        WHERE c.id = e.course_id AND c.id = ANY(v_courses) AND e.lessons_total <> c.lessons_count;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION attach_curriculum_triggers(table_name TEXT) RETURNS void AS $$
+BEGIN
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_curriculum_ins_%I ON %I', table_name, table_name);
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_curriculum_upd_%I ON %I', table_name, table_name);
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_curriculum_del_%I ON %I', table_name, table_name);
+    EXECUTE format('CREATE TRIGGER trg_curriculum_ins_%I AFTER INSERT ON %I REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION fn_bump_curriculum_version()', table_name, table_name);
+    EXECUTE format('CREATE TRIGGER trg_curriculum_upd_%I AFTER UPDATE ON %I REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION fn_bump_curriculum_version()', table_name, table_name);
+    EXECUTE format('CREATE TRIGGER trg_curriculum_del_%I AFTER DELETE ON %I REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION fn_bump_curriculum_version()', table_name, table_name);
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT attach_curriculum_triggers(t) FROM (VALUES
+    ('course_modules'),
+    ('lessons')
+) AS tbl(t);
+
 -- =========================
 -- Scalar functions
 -- =========================
@@ -141,14 +844,50 @@ BEGIN
     SELECT COALESCE(SUM(CASE WHEN p.status = 'refunded' THEN -p.amount ELSE p.amount END), 0)
     INTO v_total
     FROM payments p
-    JOIN orders o ON o.id = p.order_id
-    JOIN order_items oi ON oi.order_id = o.id
+    JOIN orders o ON o.id = p.order_id AND o.created_at = p.order_created_at
+    JOIN order_items oi ON oi.order_id = o.id AND oi.order_created_at = o.created_at
     WHERE oi.course_id = p_course_id
       AND p.status IN ('paid','refunded');
     RETURN v_total;
 END;
 $$ LANGUAGE plpgsql STABLE;
 
+-- Offline check of courses.total_revenue against the full recompute (same formula as
+-- fn_course_revenue). Returns drifted courses, with p_repair => true also fixes them.
+CREATE OR REPLACE FUNCTION fn_rebuild_course_revenue(p_repair BOOLEAN DEFAULT false)
+RETURNS TABLE (
+    course_id BIGINT,
+    stored_revenue NUMERIC(12,2),
+    actual_revenue NUMERIC(12,2)
+) AS $$
+BEGIN
+    RETURN QUERY
+    WITH drift AS (
+        SELECT c.id AS course_id,
+               c.total_revenue AS stored_revenue,
+               COALESCE(agg.total, 0)::NUMERIC(12,2) AS actual_revenue
+        FROM courses c
+        LEFT JOIN (
+            SELECT oi.course_id,
+                   SUM(CASE WHEN p.status = 'refunded' THEN -p.amount ELSE p.amount END) AS total
+            FROM payments p
+            JOIN orders o ON o.id = p.order_id AND o.created_at = p.order_created_at
+            JOIN order_items oi ON oi.order_id = o.id AND oi.order_created_at = o.created_at
+            WHERE p.status IN ('paid','refunded')
+            GROUP BY oi.course_id
+        ) agg ON agg.course_id = c.id
+        WHERE c.total_revenue <> COALESCE(agg.total, 0)::NUMERIC(12,2)
+    ), repaired AS (
+        UPDATE courses c
+        SET total_revenue = d.actual_revenue,
+            updated_at = now()
+        FROM drift d
+        WHERE p_repair AND c.id = d.course_id
+    )
+    SELECT d.course_id, d.stored_revenue, d.actual_revenue FROM drift d;
+END;
+$$ LANGUAGE plpgsql;
+
 CREATE OR REPLACE FUNCTION fn_course_rating(p_course_id BIGINT) RETURNS NUMERIC(3,2) AS $$
 DECLARE
     v_rating NUMERIC(3,2);
@@ -160,35 +899,219 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql STABLE;
 
+-- Offline check of the running rating state against a full recompute (avg_rating uses the
+-- same formula as fn_course_rating). Returns drifted courses, with p_repair => true also
+-- fixes them.
+DROP FUNCTION IF EXISTS fn_rebuild_course_rating(BOOLEAN);
+CREATE OR REPLACE FUNCTION fn_rebuild_course_rating(p_repair BOOLEAN DEFAULT false)
+RETURNS TABLE (
+    course_id BIGINT,
+    stored_sum BIGINT,
+    actual_sum BIGINT,
+    stored_count INT,
+    actual_count INT,
+    stored_counts INT[],
+    actual_counts INT[],
+    stored_rating NUMERIC(3,2),
+    actual_rating NUMERIC(3,2)
+) AS $$
+BEGIN
+    RETURN QUERY
+    WITH agg AS (
+        SELECT r.course_id,
+               SUM(r.rating) AS total,
+               COUNT(*) AS cnt,
+               AVG(r.rating) AS avg_rating,
+               ARRAY[
+                   COUNT(*) FILTER (WHERE r.rating = 1),
+                   COUNT(*) FILTER (WHERE r.rating = 2),
+                   COUNT(*) FILTER (WHERE r.rating = 3),
+                   COUNT(*) FILTER (WHERE r.rating = 4),
+                   COUNT(*) FILTER (WHERE r.rating = 5)
+               ]::INT[] AS counts
+        FROM reviews r
+        GROUP BY r.course_id
+    ), drift AS (
+        SELECT c.id AS course_id,
+               c.rating_sum AS stored_sum,
+               COALESCE(agg.total, 0)::BIGINT AS actual_sum,
+               c.reviews_count AS stored_count,
+               COALESCE(agg.cnt, 0)::INT AS actual_count,
+               c.rating_counts AS stored_counts,
+               COALESCE(agg.counts, '{0,0,0,0,0}') AS actual_counts,
+               c.avg_rating AS stored_rating,
+               COALESCE(agg.avg_rating, 0)::NUMERIC(3,2) AS actual_rating
+        FROM courses c
+        LEFT JOIN agg ON agg.course_id = c.id
+        WHERE (c.rating_sum, c.reviews_count, c.rating_counts)
+              IS DISTINCT FROM (COALESCE(agg.total, 0), COALESCE(agg.cnt, 0), COALESCE(agg.counts, '{0,0,0,0,0}'))
+    ), repaired AS (
+        UPDATE courses c
+        SET rating_sum = d.actual_sum,
+            reviews_count = d.actual_count,
+            rating_counts = d.actual_counts,
+            updated_at = now()
+        FROM drift d
+        WHERE p_repair AND c.id = d.course_id
+    )
+    SELECT d.course_id, d.stored_sum, d.actual_sum, d.stored_count, d.actual_count,
+           d.stored_counts, d.actual_counts, d.stored_rating, d.actual_rating
+    FROM drift d;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Share of progress rows (any status) that are completed over all enrollments of the
+-- course, read from the counters kept by the progresses/enrollments triggers.
 CREATE OR REPLACE FUNCTION fn_course_completion_percent(p_course_id BIGINT) RETURNS NUMERIC(5,2) AS $$
-DECLARE
-    v_completed NUMERIC;
-    v_total NUMERIC;
+    SELECT COALESCE((
+        SELECT CASE WHEN lessons_tracked_total > 0
+                    THEN ROUND(lessons_completed_total::NUMERIC / lessons_tracked_total * 100, 2)
+                    ELSE 0 END
+        FROM courses
+        WHERE id = p_course_id
+    ), 0);
+$$ LANGUAGE sql STABLE;
+
+-- Share of the course lessons the learner has completed.
+CREATE OR REPLACE FUNCTION fn_enrollment_completion_percent(p_enrollment_id BIGINT) RETURNS NUMERIC(5,2) AS $$
+    SELECT COALESCE((
+        SELECT CASE WHEN lessons_total > 0
+                    THEN LEAST(ROUND(lessons_completed::NUMERIC / lessons_total * 100, 2), 100)
+                    ELSE 0 END
+        FROM enrollments
+        WHERE id = p_enrollment_id
+    ), 0);
+$$ LANGUAGE sql STABLE;
+
+-- Progress counters recomputed from progresses and lessons: per enrollment, and
+-- rolled up per course (over all enrollments, as the enrollments trigger does).
+DROP FUNCTION IF EXISTS fn_actual_course_counters();
+DROP FUNCTION IF EXISTS fn_actual_enrollment_counters();
+CREATE OR REPLACE FUNCTION fn_actual_enrollment_counters()
+RETURNS TABLE (
+    enrollment_id BIGINT,
+    course_id BIGINT,
+    lessons_started INT,
+    lessons_completed INT,
+    lessons_tracked INT,
+    lessons_total INT
+) AS $$
+    SELECT e.id,
+           e.course_id,
+           COALESCE(pr.started, 0)::INT,
+           COALESCE(pr.completed, 0)::INT,
+           COALESCE(pr.tracked, 0)::INT,
+           COALESCE(l.lessons, 0)::INT
+    FROM enrollments e
+    LEFT JOIN (
+        SELECT p.enrollment_id,
+               COUNT(*) FILTER (WHERE p.status IN ('in_progress','completed')) AS started,
+               COUNT(*) FILTER (WHERE p.status = 'completed') AS completed,
+               COUNT(*) AS tracked
+        FROM progresses p
+        GROUP BY p.enrollment_id
+    ) pr ON pr.enrollment_id = e.id
+    LEFT JOIN (
+        SELECT l.course_id, COUNT(*) AS lessons FROM lessons l GROUP BY l.course_id
+    ) l ON l.course_id = e.course_id;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION fn_actual_course_counters()
+RETURNS TABLE (
+    course_id BIGINT,
+    lessons_count INT,
+    lessons_started_total BIGINT,
+    lessons_completed_total BIGINT,
+    lessons_tracked_total BIGINT
+) AS $$
+    SELECT c.id,
+           (SELECT COUNT(*) FROM lessons l WHERE l.course_id = c.id)::INT,
+           COALESCE(SUM(a.lessons_started), 0)::BIGINT,
+           COALESCE(SUM(a.lessons_completed), 0)::BIGINT,
+           COALESCE(SUM(a.lessons_tracked), 0)::BIGINT
+    FROM courses c
+    LEFT JOIN fn_actual_enrollment_counters() a ON a.course_id = c.id
+    GROUP BY c.id;
+$$ LANGUAGE sql STABLE;
+
+-- Offline check of the progress counters against a full recount. Reports every drifted
+-- counter on enrollments (lessons_started, lessons_completed, lessons_tracked,
+-- lessons_total) and courses (lessons_count, lessons_*_total). With p_repair the
+-- enrollments are fixed first, their trigger shifts the course totals, and the courses
+-- are then set to the recomputed values.
+DROP FUNCTION IF EXISTS fn_rebuild_progress_counters(BOOLEAN);
+CREATE OR REPLACE FUNCTION fn_rebuild_progress_counters(p_repair BOOLEAN DEFAULT false)
+RETURNS TABLE (
+    entity TEXT,
+    entity_id BIGINT,
+    counter TEXT,
+    stored_value BIGINT,
+    actual_value BIGINT
+) AS $$
 BEGIN
-    SELECT COUNT(*)::NUMERIC
-    INTO v_completed
-    FROM progresses pr
-    JOIN enrollments e ON e.id = pr.enrollment_id
-    WHERE pr.status = 'completed' AND e.course_id = p_course_id;
+    RETURN QUERY
+    SELECT 'enrollments'::TEXT, e.id, v.counter, v.stored, v.actual
+    FROM enrollments e
+    JOIN fn_actual_enrollment_counters() a ON a.enrollment_id = e.id
+    CROSS JOIN LATERAL (VALUES
+        ('lessons_started'::TEXT, e.lessons_started::BIGINT, a.lessons_started::BIGINT),
+        ('lessons_completed', e.lessons_completed, a.lessons_completed),
+        ('lessons_tracked', e.lessons_tracked, a.lessons_tracked),
+        ('lessons_total', e.lessons_total, a.lessons_total)
+    ) AS v(counter, stored, actual)
+    WHERE v.stored <> v.actual
+    UNION ALL
+    SELECT 'courses'::TEXT, c.id, v.counter, v.stored, v.actual
+    FROM courses c
+    JOIN fn_actual_course_counters() a ON a.course_id = c.id
+    CROSS JOIN LATERAL (VALUES
+        ('lessons_count'::TEXT, c.lessons_count::BIGINT, a.lessons_count::BIGINT),
+        ('lessons_started_total', c.lessons_started_total, a.lessons_started_total),
+        ('lessons_completed_total', c.lessons_completed_total, a.lessons_completed_total),
+        ('lessons_tracked_total', c.lessons_tracked_total, a.lessons_tracked_total)
+    ) AS v(counter, stored, actual)
+    WHERE v.stored <> v.actual
+    ORDER BY 1, 2, 3;
 
-    SELECT COUNT(*)::NUMERIC
-    INTO v_total
-    FROM progresses pr
-    JOIN enrollments e ON e.id = pr.enrollment_id
-    WHERE e.course_id = p_course_id;
+    IF p_repair THEN
+        UPDATE enrollments e
+        SET lessons_started = a.lessons_started,
+            lessons_completed = a.lessons_completed,
+            lessons_tracked = a.lessons_tracked,
+            lessons_total = a.lessons_total
+        FROM fn_actual_enrollment_counters() a
+        WHERE e.id = a.enrollment_id
+          AND (e.lessons_started, e.lessons_completed, e.lessons_tracked, e.lessons_total)
+              <> (a.lessons_started, a.lessons_completed, a.lessons_tracked, a.lessons_total);
 
-    IF v_total = 0 THEN
-        RETURN 0;
+        UPDATE courses c
+        SET lessons_count = a.lessons_count,
+            lessons_started_total = a.lessons_started_total,
+            lessons_completed_total = a.lessons_completed_total,
+            lessons_tracked_total = a.lessons_tracked_total
+        FROM fn_actual_course_counters() a
+        WHERE c.id = a.course_id
+          AND (c.lessons_count, c.lessons_started_total, c.lessons_completed_total, c.lessons_tracked_total)
+              <> (a.lessons_count, a.lessons_started_total, a.lessons_completed_total, a.lessons_tracked_total);
     END IF;
-    RETURN ROUND((v_completed / v_total) * 100, 2);
 END;
-$$ LANGUAGE plpgsql STABLE;
+$$ LANGUAGE plpgsql;
 
 -- =========================
 -- Table functions (reports)
 -- =========================
 
-CREATE OR REPLACE FUNCTION fn_top_courses_by_revenue(p_start TIMESTAMPTZ, p_end TIMESTAMPTZ, p_limit INT DEFAULT 10)
+-- Payments are partitioned by their order's month. A payment is accepted at most
+-- p_max_order_age (PAYMENT_MAX_ORDER_AGE_DAYS) after its order was created, so payments
+-- made in [p_start, p_end] belong to orders of [p_start - p_max_order_age, p_end]. The
+-- bounds on order_created_at / created_at limit every partitioned table to those months.
+DROP FUNCTION IF EXISTS fn_top_courses_by_revenue(TIMESTAMPTZ, TIMESTAMPTZ, INT);
+CREATE OR REPLACE FUNCTION fn_top_courses_by_revenue(
+    p_start TIMESTAMPTZ,
+    p_end TIMESTAMPTZ,
+    p_limit INT DEFAULT 10,
+    p_max_order_age INTERVAL DEFAULT INTERVAL '30 days'
+)
 RETURNS TABLE (
     course_id BIGINT,
     title TEXT,
@@ -206,9 +1129,12 @@ BEGIN
         COUNT(p.id)::INT AS payments_count
     FROM courses c
     JOIN order_items oi ON oi.course_id = c.id
-    JOIN orders o ON o.id = oi.order_id
-    JOIN payments p ON p.order_id = o.id
+    JOIN orders o ON o.id = oi.order_id AND o.created_at = oi.order_created_at
+    JOIN payments p ON p.order_id = o.id AND p.order_created_at = o.created_at
     WHERE p.paid_at BETWEEN p_start AND p_end
+      AND p.order_created_at BETWEEN p_start - p_max_order_age AND p_end
+      AND o.created_at BETWEEN p_start - p_max_order_age AND p_end
+      AND oi.order_created_at BETWEEN p_start - p_max_order_age AND p_end
       AND p.status IN ('paid','refunded')
     GROUP BY c.id, c.title
     ORDER BY revenue DESC
@@ -216,7 +1142,12 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql STABLE;
 
-CREATE OR REPLACE FUNCTION fn_user_activity(p_start TIMESTAMPTZ, p_end TIMESTAMPTZ)
+DROP FUNCTION IF EXISTS fn_user_activity(TIMESTAMPTZ, TIMESTAMPTZ);
+CREATE OR REPLACE FUNCTION fn_user_activity(
+    p_start TIMESTAMPTZ,
+    p_end TIMESTAMPTZ,
+    p_max_order_age INTERVAL DEFAULT INTERVAL '30 days'
+)
 RETURNS TABLE (
     user_id INT,
     email TEXT,
@@ -250,8 +1181,10 @@ BEGIN
     LEFT JOIN (
         SELECT o.user_id, COUNT(*)::INT AS payments_count
         FROM payments p
-        JOIN orders o ON o.id = p.order_id
+        JOIN orders o ON o.id = p.order_id AND o.created_at = p.order_created_at
         WHERE p.paid_at BETWEEN p_start AND p_end
+          AND p.order_created_at BETWEEN p_start - p_max_order_age AND p_end
+          AND o.created_at BETWEEN p_start - p_max_order_age AND p_end
           AND p.status IN ('paid','refunded')
         GROUP BY o.user_id
     ) pay ON pay.user_id = u.id
@@ -259,7 +1192,12 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql STABLE;
 
-CREATE OR REPLACE FUNCTION fn_sales_dynamics(p_start TIMESTAMPTZ, p_end TIMESTAMPTZ)
+DROP FUNCTION IF EXISTS fn_sales_dynamics(TIMESTAMPTZ, TIMESTAMPTZ);
+CREATE OR REPLACE FUNCTION fn_sales_dynamics(
+    p_start TIMESTAMPTZ,
+    p_end TIMESTAMPTZ,
+    p_max_order_age INTERVAL DEFAULT INTERVAL '30 days'
+)
 RETURNS TABLE (
     period_start DATE,
     revenue NUMERIC(12,2),
@@ -274,8 +1212,10 @@ BEGIN
         COUNT(DISTINCT o.id)::INT AS orders_count,
         COUNT(p.id)::INT AS payments_count
     FROM payments p
-    JOIN orders o ON o.id = p.order_id
+    JOIN orders o ON o.id = p.order_id AND o.created_at = p.order_created_at
     WHERE p.paid_at BETWEEN p_start AND p_end
+      AND p.order_created_at BETWEEN p_start - p_max_order_age AND p_end
+      AND o.created_at BETWEEN p_start - p_max_order_age AND p_end
       AND p.status IN ('paid','refunded')
     GROUP BY date_trunc('month', p.paid_at)
     ORDER BY period_start;
@@ -296,8 +1236,8 @@ SELECT
     COUNT(DISTINCT e.id) AS enrollments_total
 FROM courses c
 LEFT JOIN order_items oi ON oi.course_id = c.id
-LEFT JOIN orders o ON o.id = oi.order_id
-LEFT JOIN payments p ON p.order_id = o.id AND p.status IN ('paid','refunded')
+LEFT JOIN orders o ON o.id = oi.order_id AND o.created_at = oi.order_created_at
+LEFT JOIN payments p ON p.order_id = o.id AND p.order_created_at = o.created_at AND p.status IN ('paid','refunded')
 LEFT JOIN enrollments e ON e.course_id = c.id
 GROUP BY c.id, c.title;
 
@@ -315,10 +1255,9 @@ CREATE OR REPLACE VIEW vw_user_progress AS
 SELECT
     u.id AS user_id,
     u.email,
-    COUNT(DISTINCT e.id) AS enrollments_count,
-    COUNT(DISTINCT pr.id) FILTER (WHERE pr.status = 'completed') AS lessons_completed,
-    COUNT(DISTINCT pr.id) FILTER (WHERE pr.status IN ('in_progress','completed')) AS lessons_started
+    COUNT(e.id) AS enrollments_count,
+    COALESCE(SUM(e.lessons_completed), 0) AS lessons_completed,
+    COALESCE(SUM(e.lessons_started), 0) AS lessons_started
 FROM users u
 LEFT JOIN enrollments e ON e.user_id = u.id
-LEFT JOIN progresses pr ON pr.enrollment_id = e.id
 GROUP BY u.id, u.email;